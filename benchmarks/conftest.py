@@ -0,0 +1,52 @@
+"""
+Shared fixtures of the benchmark suite. Run it with
+
+    pytest benchmarks/ --benchmark-autosave
+    pytest benchmarks/ --benchmark-compare --benchmark-compare-fail=mean:25%
+
+the first run saving a baseline under .benchmarks/ that later runs on the
+same machine are compared against.
+"""
+import tracemalloc
+from typing import Callable
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from ibge.brasil import clear_cache, index  # noqa: E402
+
+
+@pytest.fixture(params=["sql", "index"])
+def backend(request):
+    """Runs the benchmark querying DuckDB and with the in-memory index"""
+    if request.param == "index":
+        index.load()
+    else:
+        index.unload()
+    clear_cache()
+    yield request.param
+    index.unload()
+    clear_cache()
+
+
+@pytest.fixture
+def measure(benchmark) -> Callable:
+    """
+    Benchmarks `function()` with a cold (cleared before every round) or warm
+    object cache, recording its tracemalloc peak in the benchmark's extra info
+    """
+
+    def run(function: Callable, cache: str, rounds: int = 5):
+        if cache == "cold":
+            clear_cache()
+        tracemalloc.start()
+        function()
+        benchmark.extra_info["peak_kib"] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+
+        if cache == "cold":
+            return benchmark.pedantic(function, setup=clear_cache, rounds=rounds)
+        return benchmark(function)
+
+    return run
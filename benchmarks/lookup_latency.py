@@ -0,0 +1,56 @@
+"""
+Per-lookup latency of the single-row statements in ibge.sql.queries: ad-hoc
+SQL with the values formatted into the query text (how lookups used to be
+written) versus the named statements prepared once per connection.
+
+    python benchmarks/lookup_latency.py [repetitions]
+"""
+import re
+import sys
+import time
+
+from ibge import sql
+
+LOOKUPS = [
+    ("state_by_id", (33,)),
+    ("state_by_uf", ("RJ",)),
+    ("mesoregion_by_name", ("Baixadas",)),
+    ("microregion_by_id", (33018,)),
+    ("microregions_by_name", ("Serrana",)),
+    ("microregions_by_name_and_mesoregion", ("Serrana", "Baixadas")),
+    ("city_by_id", (3304557,)),
+    ("cities_by_microregion", (33018,)),
+]
+
+
+def adhoc(name: str, *params) -> list:
+    query = re.sub(
+        r"\$(\d+)",
+        lambda match: sql.literal(params[int(match.group(1)) - 1]),
+        sql.pool.statements[name],
+    )
+    return sql.cursor().sql(query).fetchall()
+
+
+def prepared(name: str, *params) -> list:
+    return sql.execute(name, *params).fetchall()
+
+
+def latency(lookup, name: str, params: tuple, repetitions: int) -> float:
+    lookup(name, *params)
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        lookup(name, *params)
+    return (time.perf_counter() - start) / repetitions * 1e6
+
+
+def main(repetitions: int = 2000) -> None:
+    print(f"{'statement':<38}{'ad-hoc (µs)':>14}{'prepared (µs)':>16}")
+    for name, params in LOOKUPS:
+        before = latency(adhoc, name, params, repetitions)
+        after = latency(prepared, name, params, repetitions)
+        print(f"{name:<38}{before:>14.1f}{after:>16.1f}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,44 @@
+"""
+Memory held by a fully loaded territorial hierarchy: every Municipio built
+(with its parents reachable) and counted per class, as measured by
+tracemalloc. The in-memory index is loaded first so its tables don't count.
+
+    python benchmarks/memory_footprint.py
+"""
+import gc
+import tracemalloc
+
+from ibge.brasil import index, Macrorregiao, Estado, Mesorregiao, Microrregiao
+from ibge.brasil import Municipio, clear_cache
+
+CLASSES = [Macrorregiao, Estado, Mesorregiao, Microrregiao, Municipio]
+
+
+def instances(cls: type) -> int:
+    return len({id(instance) for instance in cls._instances.values()})
+
+
+def main() -> None:
+    territory = index.load()
+    clear_cache()
+    gc.collect()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+
+    cities = Municipio.many(list(territory.cities))
+    for city in cities:
+        city.macrorregiao
+
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    tracemalloc.stop()
+
+    for cls in CLASSES:
+        print(f"{cls.__name__:<14}{instances(cls):>8} instances")
+    print(f"{'total':<14}{size / 1024:>8.0f} KiB ({size / len(cities):.0f} B/city)")
+
+
+if __name__ == "__main__":
+    main()
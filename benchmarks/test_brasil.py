@@ -0,0 +1,152 @@
+"""
+Construction and traversal of ibge.brasil objects, by backend (SQL or
+in-memory index) and object cache state. See conftest.py for how to run.
+"""
+import pickle
+
+import numpy as np
+import pytest
+
+from ibge.brasil import Macrorregiao, Estado, Mesorregiao, Microrregiao, Municipio
+from ibge.brasil import buscar, geo, geocodes, search
+from ibge.brasil import (
+    get_states_from_macroregion,
+    get_mesoregions_from_macroregion,
+    get_microregion_from_macroregion,
+    get_cities_from_macroregion,
+    get_mesoregions_from_state,
+    get_microregions_from_state,
+    get_cities_from_state,
+    get_microregions_from_mesoregion,
+    get_cities_from_mesoregion,
+    get_cities_from_microregion,
+)
+
+UNITS = {
+    "Macrorregiao": lambda: Macrorregiao(geocodigo=2),
+    "Estado": lambda: Estado(uf="RJ"),
+    "Mesorregiao": lambda: Mesorregiao("Metropolitana do Rio de Janeiro"),
+    "Microrregiao": lambda: Microrregiao(__id__=33018),
+    "Municipio": lambda: Municipio(3304557),
+}
+
+COLLECTIONS = [
+    ("Macrorregiao", "estados"),
+    ("Macrorregiao", "mesorregioes"),
+    ("Macrorregiao", "microrregioes"),
+    ("Macrorregiao", "municipios"),
+    ("Estado", "mesorregioes"),
+    ("Estado", "microrregioes"),
+    ("Estado", "municipios"),
+    ("Mesorregiao", "microrregioes"),
+    ("Mesorregiao", "municipios"),
+    ("Microrregiao", "municipios"),
+]
+
+HELPERS = [
+    (get_states_from_macroregion, "Macrorregiao"),
+    (get_mesoregions_from_macroregion, "Macrorregiao"),
+    (get_microregion_from_macroregion, "Macrorregiao"),
+    (get_cities_from_macroregion, "Macrorregiao"),
+    (get_mesoregions_from_state, "Estado"),
+    (get_microregions_from_state, "Estado"),
+    (get_cities_from_state, "Estado"),
+    (get_microregions_from_mesoregion, "Mesorregiao"),
+    (get_cities_from_mesoregion, "Mesorregiao"),
+    (get_cities_from_microregion, "Microrregiao"),
+]
+
+
+@pytest.mark.parametrize("cache", ["cold", "warm"])
+@pytest.mark.parametrize("unit", list(UNITS))
+def test_construction(benchmark, measure, backend, unit, cache):
+    benchmark.group = f"construction-{unit}"
+    measure(UNITS[unit], cache)
+
+
+@pytest.mark.parametrize("cache", ["cold", "warm"])
+@pytest.mark.parametrize("unit, collection", COLLECTIONS)
+def test_collection(benchmark, measure, backend, unit, collection, cache):
+    benchmark.group = f"collection-{unit}.{collection}"
+    measure(lambda: getattr(UNITS[unit](), collection), cache, rounds=3)
+
+
+@pytest.mark.parametrize("raw", [False, True], ids=["objects", "raw"])
+@pytest.mark.parametrize(
+    "helper, unit", HELPERS, ids=[helper.__name__ for helper, _ in HELPERS]
+)
+def test_helper(benchmark, measure, backend, helper, unit, raw):
+    benchmark.group = f"helper-{helper.__name__}"
+    measure(lambda: helper(UNITS[unit](), raw=raw), "cold", rounds=3)
+
+
+@pytest.mark.parametrize("texto", ["sao jo", "niteroi", "sao paolo"])
+def test_buscar(benchmark, backend, texto):
+    benchmark.group = "buscar"
+    search.reset()
+    search.load()
+    benchmark(buscar, texto)
+
+
+@pytest.mark.parametrize("points", [1, 100_000])
+def test_nearest(benchmark, points):
+    benchmark.group = "nearest"
+    rng = np.random.default_rng(0)
+    latitudes = rng.uniform(-30, 0, points)
+    longitudes = rng.uniform(-60, -40, points)
+    geo.load().candidates(1)
+    benchmark(geo.nearest, latitudes, longitudes)
+
+
+@pytest.mark.parametrize("raio", [10, 100])
+def test_within(benchmark, raio):
+    benchmark.group = "within"
+    rng = np.random.default_rng(0)
+    latitudes = rng.uniform(-30, 0, 100_000)
+    longitudes = rng.uniform(-60, -40, 100_000)
+    geo.load()
+    benchmark.pedantic(geo.within, (latitudes, longitudes, raio), rounds=3)
+
+
+@pytest.mark.parametrize("dtype", ["float64", "float32"])
+def test_distance_matrix(benchmark, measure, dtype):
+    benchmark.group = "distance_matrix"
+    geo.load()
+    measure(lambda: geo.distance_matrix(dtype=dtype), "warm", rounds=1)
+
+
+@pytest.mark.parametrize("step", ["dumps", "loads"])
+def test_pickle(benchmark, backend, step):
+    """A Macrorregiao with every collection below it loaded"""
+    benchmark.group = "pickle"
+    macroregion = Macrorregiao(geocodigo=4)
+    for unit in [macroregion, *macroregion.estados, *macroregion.mesorregioes]:
+        unit.microrregioes, unit.municipios
+    data = pickle.dumps(macroregion)
+    benchmark.extra_info["bytes"] = len(data)
+
+    if step == "dumps":
+        benchmark(pickle.dumps, macroregion)
+    else:
+        benchmark(pickle.loads, data)
+
+
+@pytest.mark.parametrize("function", ["valid", "expand", "truncate", "state", "uf"])
+def test_geocodes(benchmark, function):
+    benchmark.group = "geocodes"
+    codes = np.random.default_rng(0).integers(1_000_000, 6_000_000, 10_000_000)
+    geocodes.load()
+    benchmark.pedantic(getattr(geocodes, function), (codes,), rounds=3)
+
+
+def test_rollup(benchmark):
+    """Every city with two values, up to all levels in one query"""
+    pd = pytest.importorskip("pandas")
+    from ibge.brasil import frames
+
+    benchmark.group = "rollup"
+    cities = geocodes.load().cities
+    cities = cities[cities > 0]
+    df = pd.DataFrame({"geocodigo": cities, "valor": 1.0, "casos": 1})
+    levels = list(frames.LEVELS)
+    benchmark.pedantic(frames.rollup, (df,), {"levels": levels}, rounds=5)
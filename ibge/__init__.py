@@ -1,13 +1,18 @@
 """ibge-utils Python Package"""
-from importlib import metadata as importlib_metadata
 
 
 def get_version() -> str:
+    from importlib import metadata as importlib_metadata
+
     try:
         return importlib_metadata.version(__name__)
     except importlib_metadata.PackageNotFoundError:  # pragma: no cover
         return "0.1.0"  # changed by semantic-release
 
 
-version: str = get_version()
-__version__: str = version
+def __getattr__(name: str) -> str:
+    # importlib.metadata alone takes longer to import than the rest of the
+    # package, so the version is only read when asked for
+    if name in ("version", "__version__"):
+        return get_version()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
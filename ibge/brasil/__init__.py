@@ -1,13 +1,39 @@
-from typing import Union, Optional, List, ForwardRef, Self
-from pathlib import Path
+from array import array
+from typing import Callable, Dict, Hashable, Iterable, Iterator, Union, Optional, List
+from typing import ForwardRef, Self
 
-import duckdb
+from ibge.sql import IBGE_DB, execute  # noqa: F401
+from ibge.brasil import index, search
+from ibge.brasil.cache import Interned, clear_cache, loading  # noqa: F401
+from ibge.brasil.search import buscar, Resultado  # noqa: F401
+from ibge.sql.tracing import trace  # noqa: F401
 
 
-IBGE_DB = str((Path(__file__).parent.parent / "data" / "ibge.duckdb").absolute())
+class Raw:
+    """
+    Collections of a territorial unit as plain keys instead of objects:
+    `array('i')` of geocodes (or ids, for Microrregiões) and lists of names
+    for Mesorregiões. Mirrors the unit's properties, e.g.
+    `Macrorregiao(geocodigo=2).raw.municipios`.
+    """
 
+    __slots__ = ("_unit", "_helpers")
 
-class Macrorregiao:
+    def __init__(self, unit: object, helpers: Dict[str, Callable]):
+        self._unit = unit
+        self._helpers = helpers
+
+    def __getattr__(self, name: str) -> Union[array, List[str]]:
+        helpers = object.__getattribute__(self, "_helpers")
+        if name not in helpers:
+            raise AttributeError(f"{name!r} não é uma coleção de {self._unit!r}")
+        return helpers[name](self._unit, raw=True)
+
+    def __dir__(self) -> List[str]:
+        return list(self._helpers)
+
+
+class Macrorregiao(metaclass=Interned):
     geocodigo: int
     nome: str
     __states__: List[ForwardRef("Estado")]
@@ -15,6 +41,16 @@ class Macrorregiao:
     __microregions__: List[ForwardRef("Microrregiao")]
     __cities__: List[ForwardRef("Municipio")]
 
+    __slots__ = (
+        "geocodigo",
+        "nome",
+        "__states__",
+        "__mesoregions__",
+        "__microregions__",
+        "__cities__",
+        "__weakref__",
+    )
+
     _macroregions = {
         1: "Norte",
         2: "Nordeste",
@@ -55,10 +91,25 @@ class Macrorregiao:
 
             self.geocodigo = rev_macroregions[self.nome]
 
-        self.__states__ = []
-        self.__mesoregions__ = []
-        self.__microregions__ = []
-        self.__cities__ = []
+        self.__states__ = None
+        self.__mesoregions__ = None
+        self.__microregions__ = None
+        self.__cities__ = None
+
+    @classmethod
+    def _lookup_key(
+        cls, nome: Optional[str] = None, geocodigo: Optional[Union[int, str]] = None
+    ) -> Optional[Hashable]:
+        if nome and geocodigo:
+            return None
+        if geocodigo and str(geocodigo).isdigit():
+            return int(geocodigo)
+        if nome:
+            return nome.capitalize()
+        return None
+
+    def _keys(self) -> List[Hashable]:
+        return [self.geocodigo, self.nome]
 
     def __str__(self) -> str:
         return self.nome
@@ -69,6 +120,11 @@ class Macrorregiao:
     def __hash__(self) -> int:
         return self.geocodigo
 
+    def __reduce__(self) -> tuple:
+        # Pickled as the key alone (no parents or loaded collections) and
+        # unpickled through the cache, as every class below
+        return Macrorregiao, (None, self.geocodigo)
+
     def __eq__(self, other: Self) -> bool:
         if not isinstance(other, Macrorregiao):
             return ValueError("Not a Macrorregiao")
@@ -76,53 +132,97 @@ class Macrorregiao:
 
     @property
     def estados(self) -> List[ForwardRef("Estado")]:
-        if not self.__states__:
-            self._load_states()
+        if self.__states__ is None:
+            with loading(self):
+                if self.__states__ is None:
+                    self._load_states()
         return self.__states__
 
     @property
     def mesorregioes(self) -> List[ForwardRef("Mesorregiao")]:
-        if not self.__states__:
-            self._load_states()
-
-        if not self.__mesoregions__:
-            self.__mesoregions__ = get_mesoregions_from_macroregion(self)
-
+        if self.__mesoregions__ is None:
+            with loading(self):
+                if self.__mesoregions__ is None:
+                    self.__mesoregions__ = get_mesoregions_from_macroregion(self)
+                    _wire(self.__mesoregions__, "_state", Estado, "__mesoregions__")
         return self.__mesoregions__
 
     @property
     def microrregioes(self) -> List[ForwardRef("Microrregiao")]:
-        if not self.__states__:
-            self._load_states()
-
-        if not self.__microregions__:
-            self.__microregions__ = get_microregion_from_macroregion(self)
-
+        if self.__microregions__ is None:
+            with loading(self):
+                if self.__microregions__ is None:
+                    self.__microregions__ = get_microregion_from_macroregion(self)
+                    _wire(
+                        self.__microregions__,
+                        "_mesoregion",
+                        Mesorregiao,
+                        "__microregions__",
+                    )
         return self.__microregions__
 
     @property
     def municipios(self) -> List[ForwardRef("Municipio")]:
-        if not self.__states__:
-            self._load_states()
+        if self.__cities__ is None:
+            with loading(self):
+                if self.__cities__ is None:
+                    self.__cities__ = get_cities_from_macroregion(self)
+                    _wire(self.__cities__, "_microregion", Microrregiao, "__cities__")
+        return self.__cities__
 
-        if not self.__cities__:
-            self.__cities__ = get_cities_from_macroregion(self)
+    def iter_estados(self, lote: int = 1000) -> Iterator[ForwardRef("Estado")]:
+        return _iterate(self, "__states__", get_states_from_macroregion, lote)
 
-        return self.__cities__
+    def iter_mesorregioes(
+        self, lote: int = 1000
+    ) -> Iterator[ForwardRef("Mesorregiao")]:
+        return _iterate(self, "__mesoregions__", get_mesoregions_from_macroregion, lote)
+
+    def iter_microrregioes(
+        self, lote: int = 1000
+    ) -> Iterator[ForwardRef("Microrregiao")]:
+        return _iterate(
+            self, "__microregions__", get_microregion_from_macroregion, lote
+        )
+
+    def iter_municipios(self, lote: int = 1000) -> Iterator[ForwardRef("Municipio")]:
+        return _iterate(self, "__cities__", get_cities_from_macroregion, lote)
+
+    @property
+    def raw(self) -> Raw:
+        return Raw(
+            self,
+            {
+                "estados": get_states_from_macroregion,
+                "mesorregioes": get_mesoregions_from_macroregion,
+                "microrregioes": get_microregion_from_macroregion,
+                "municipios": get_cities_from_macroregion,
+            },
+        )
 
     def _load_states(self) -> None:
         self.__states__ = get_states_from_macroregion(self)
 
 
-class Estado:
+class Estado(metaclass=Interned):
     geocodigo: int
     nome: str
     uf: str
-    macrorregiao: Macrorregiao
     __mesoregions__: List[ForwardRef("Mesorregiao")]
     __microregions__: List[ForwardRef("Microrregiao")]
     __cities__: List[ForwardRef("Municipio")]
 
+    __slots__ = (
+        "geocodigo",
+        "nome",
+        "uf",
+        "_macroregion",
+        "__mesoregions__",
+        "__microregions__",
+        "__cities__",
+        "__weakref__",
+    )
+
     def __init__(
         self,
         geocodigo: Optional[Union[int, str]] = None,
@@ -131,32 +231,48 @@ class Estado:
         if uf and geocodigo:
             raise ValueError("Utilize `UF` ou `geocodigo` para instanciar Estados")
 
-        try:
-            db = duckdb.connect(IBGE_DB)
-            if geocodigo:
-                state_df = db.sql(
-                    f"SELECT * FROM states WHERE id = {geocodigo}"
-                ).fetchdf()
-            if uf:
-                state_df = db.sql(
-                    f"SELECT * FROM states WHERE uf = '{uf.upper()}'"
-                ).fetchdf()
-        finally:
-            db.close()
-
-        if state_df.empty:
+        state = _fetch_state(geocodigo=geocodigo, uf=uf)
+
+        if state is None:
             raise ValueError(
                 "Geocódigo ou UF não encontrado. Exemplo: "
                 "`Estado(geocodigo=11)` ou `Estado(uf='RO')` (Rondônia)"
             )
 
-        self.geocodigo = state_df["id"].to_list()[0]
-        self.nome = state_df["name"].to_list()[0]
-        self.uf = state_df["uf"].to_list()[0]
-        self.macrorregiao = Macrorregiao(geocodigo=state_df["macroregion"].to_list()[0])
-        self.__mesoregions__ = []
-        self.__microregions__ = []
-        self.__cities__ = []
+        self._load(state)
+
+    def _load(self, row: tuple) -> None:
+        self.geocodigo, self.nome, self.uf, self._macroregion = row
+        self.__mesoregions__ = None
+        self.__microregions__ = None
+        self.__cities__ = None
+
+    @classmethod
+    def many(
+        cls, geocodigos: Iterable[Union[int, str]], on_missing: str = "raise"
+    ) -> List[Optional[Self]]:
+        """
+        Estados of all `geocodigos`, in the same order, resolved with a single
+        query. `on_missing` handles unknown geocodes: "raise", "skip" or "none"
+        """
+        return _many(geocodigos, _int_key, _states_by_id, on_missing, "Estados")
+
+    @classmethod
+    def _lookup_key(
+        cls,
+        geocodigo: Optional[Union[int, str]] = None,
+        uf: Optional[str] = None,
+    ) -> Optional[Hashable]:
+        if uf and geocodigo:
+            return None
+        if geocodigo and str(geocodigo).isdigit():
+            return int(geocodigo)
+        if uf:
+            return uf.upper()
+        return None
+
+    def _keys(self) -> List[Hashable]:
+        return [self.geocodigo, self.uf]
 
     def __str__(self) -> str:
         return self.nome
@@ -167,76 +283,125 @@ class Estado:
     def __hash__(self) -> int:
         return self.geocodigo
 
+    def __reduce__(self) -> tuple:
+        return Estado, (self.geocodigo,)
+
     def __eq__(self, other: Self) -> bool:
         if not isinstance(other, Estado):
             return ValueError("Not an Estado")
         return self.geocodigo == other.geocodigo
 
+    @property
+    def macrorregiao(self) -> Macrorregiao:
+        return Macrorregiao(geocodigo=self._macroregion)
+
     @property
     def mesorregioes(self) -> List[ForwardRef("Mesorregiao")]:
-        if not self.__mesoregions__:
-            self._load_mesoregions()
+        if self.__mesoregions__ is None:
+            with loading(self):
+                if self.__mesoregions__ is None:
+                    self._load_mesoregions()
         return self.__mesoregions__
 
     @property
     def microrregioes(self) -> List[ForwardRef("Microrregiao")]:
-        if not self.__mesoregions__:
-            self._load_mesoregions()
-
-        if not self.__microregions__:
-            microregions = []
-            for mesoregion in self.__mesoregions__:
-                microregions.extend(mesoregion.microrregioes)
-            self.__microregions__ = microregions
-
+        if self.__microregions__ is None:
+            with loading(self):
+                if self.__microregions__ is None:
+                    self.__microregions__ = get_microregions_from_state(self)
+                    _wire(
+                        self.__microregions__,
+                        "_mesoregion",
+                        Mesorregiao,
+                        "__microregions__",
+                    )
         return self.__microregions__
 
     @property
     def municipios(self) -> List[ForwardRef("Municipio")]:
-        if not self.__mesoregions__:
-            self._load_mesoregions()
+        if self.__cities__ is None:
+            with loading(self):
+                if self.__cities__ is None:
+                    self.__cities__ = get_cities_from_state(self)
+                    _wire(self.__cities__, "_microregion", Microrregiao, "__cities__")
+        return self.__cities__
 
-        if not self.__cities__:
-            cities = []
-            for microregion in self.microrregioes:
-                cities.extend(microregion.municipios)
-            self.__cities__ = cities
+    def iter_mesorregioes(
+        self, lote: int = 1000
+    ) -> Iterator[ForwardRef("Mesorregiao")]:
+        return _iterate(self, "__mesoregions__", get_mesoregions_from_state, lote)
 
-        return self.__cities__
+    def iter_microrregioes(
+        self, lote: int = 1000
+    ) -> Iterator[ForwardRef("Microrregiao")]:
+        return _iterate(self, "__microregions__", get_microregions_from_state, lote)
+
+    def iter_municipios(self, lote: int = 1000) -> Iterator[ForwardRef("Municipio")]:
+        return _iterate(self, "__cities__", get_cities_from_state, lote)
+
+    @property
+    def raw(self) -> Raw:
+        return Raw(
+            self,
+            {
+                "mesorregioes": get_mesoregions_from_state,
+                "microrregioes": get_microregions_from_state,
+                "municipios": get_cities_from_state,
+            },
+        )
 
     def _load_mesoregions(self) -> None:
         self.__mesoregions__ = get_mesoregions_from_state(self)
 
 
-class Mesorregiao:
+class Mesorregiao(metaclass=Interned):
     nome: str
     id_geografico: int
-    macrorregiao: Macrorregiao
-    estado: Estado
     __microregions__: List[ForwardRef("Microrregiao")]
     __cities__: List[ForwardRef("Municipio")]
 
+    __slots__ = (
+        "nome",
+        "id_geografico",
+        "_state",
+        "__microregions__",
+        "__cities__",
+        "__weakref__",
+    )
+
     def __init__(self, nome: str):
-        try:
-            db = duckdb.connect(IBGE_DB)
-            mesoregion_df = db.sql(
-                f"SELECT * FROM mesoregions WHERE LOWER(name) = '{nome.lower()}'"
-            ).fetchdf()
-        finally:
-            db.close()
-
-        if mesoregion_df.empty:
+        mesoregion = _fetch_mesoregion(nome)
+
+        if mesoregion is None:
             raise ValueError(
                 f"Mesorregião `{nome}` não encontrada. Por favor, verifique a "
                 "acentuação. Exemplo: `Mesorregiao('Vale do Itajaí')`"
             )
 
-        self.nome = nome
-        self.id_geografico = mesoregion_df["geographic_id"][0]
-        self.estado = Estado(geocodigo=mesoregion_df["state"][0])
-        self.macrorregiao = self.estado.macrorregiao
-        self.__microregions__ = []
-        self.__cities__ = []
+        self._load(mesoregion)
+
+    def _load(self, row: tuple) -> None:
+        self.nome, self._state, self.id_geografico = row
+        self.__microregions__ = None
+        self.__cities__ = None
+
+    @classmethod
+    def many(
+        cls, nomes: Iterable[str], on_missing: str = "raise"
+    ) -> List[Optional[Self]]:
+        """
+        Mesorregiões of all `nomes` (case insensitive), in the same order,
+        resolved with a single query. `on_missing` handles unknown names:
+        "raise", "skip" or "none"
+        """
+        return _many(nomes, str.lower, _mesoregions_by_name, on_missing, "Mesorregiões")
+
+    @classmethod
+    def _lookup_key(cls, nome: str) -> Optional[Hashable]:
+        return nome.lower()
+
+    def _keys(self) -> List[Hashable]:
+        return [self.nome, self.nome.lower()]
 
     def __str__(self) -> str:
         return self.nome
@@ -247,42 +412,77 @@ class Mesorregiao:
     def __hash__(self) -> int:
         return self.nome
 
+    def __reduce__(self) -> tuple:
+        return Mesorregiao, (self.nome,)
+
     def __eq__(self, other: Self) -> bool:
         if not isinstance(other, Mesorregiao):
             return ValueError("Not a Mesorregiao")
         return self.nome == other.nome
 
+    @property
+    def estado(self) -> Estado:
+        return Estado(geocodigo=self._state)
+
+    @property
+    def macrorregiao(self) -> Macrorregiao:
+        return self.estado.macrorregiao
+
     @property
     def microrregioes(self) -> List[ForwardRef("Microrregiao")]:
-        if not self.__microregions__:
-            self._load_microregions()
+        if self.__microregions__ is None:
+            with loading(self):
+                if self.__microregions__ is None:
+                    self._load_microregions()
         return self.__microregions__
 
     @property
     def municipios(self) -> List[ForwardRef("Municipio")]:
-        if not self.__microregions__:
-            self._load_microregions()
+        if self.__cities__ is None:
+            with loading(self):
+                if self.__cities__ is None:
+                    self.__cities__ = get_cities_from_mesoregion(self)
+                    _wire(self.__cities__, "_microregion", Microrregiao, "__cities__")
+        return self.__cities__
 
-        if not self.__cities__:
-            cities = []
-            for microregion in self.__microregions__:
-                cities.extend(microregion.municipios)
-            self.__cities__ = cities
+    def iter_microrregioes(
+        self, lote: int = 1000
+    ) -> Iterator[ForwardRef("Microrregiao")]:
+        return _iterate(
+            self, "__microregions__", get_microregions_from_mesoregion, lote
+        )
 
-        return self.__cities__
+    def iter_municipios(self, lote: int = 1000) -> Iterator[ForwardRef("Municipio")]:
+        return _iterate(self, "__cities__", get_cities_from_mesoregion, lote)
+
+    @property
+    def raw(self) -> Raw:
+        return Raw(
+            self,
+            {
+                "microrregioes": get_microregions_from_mesoregion,
+                "municipios": get_cities_from_mesoregion,
+            },
+        )
 
     def _load_microregions(self) -> None:
         self.__microregions__ = get_microregions_from_mesoregion(self)
 
 
-class Microrregiao:
+class Microrregiao(metaclass=Interned):
     __id__: int
     nome: str
     id_geografico: int
-    macrorregiao: Macrorregiao
-    estado: Estado
-    mesorregiao: Mesorregiao
-    municipios: List[ForwardRef("Municipio")]
+    __cities__: List[ForwardRef("Municipio")]
+
+    __slots__ = (
+        "__id__",
+        "nome",
+        "id_geografico",
+        "_mesoregion",
+        "__cities__",
+        "__weakref__",
+    )
 
     def __init__(
         self,
@@ -290,65 +490,66 @@ class Microrregiao:
         mesorregiao: Optional[str] = None,
         __id__: Optional[int] = None,
     ):
-        try:
-            db = duckdb.connect(IBGE_DB)
-
-            if nome:
-                if "'" in nome:
-                    nome = nome.replace("'", r"''")
-
-                if mesorregiao:
-                    microregion_df = db.sql(
-                        "SELECT * FROM microregions WHERE LOWER(name) = '"
-                        f"{nome.lower()}"
-                        f"' AND LOWER(mesoregion) = '{mesorregiao.lower()}'"
-                    ).fetchdf()
-                else:
-                    microregion_df = db.sql(
-                        "SELECT * FROM microregions WHERE LOWER(name) = "
-                        f"'{nome.lower()}'"
-                    ).fetchdf()
-
-                if "''" in nome:
-                    nome = nome.replace("''", "'")
-
-            if __id__ is not None:
-                __id__ = int(__id__)
-                microregion_df = db.sql(
-                    f"SELECT * FROM microregions WHERE id = {__id__}"
-                ).fetchdf()
-
-        finally:
-            db.close()
-
-        if microregion_df.empty:
+        microregions = []
+
+        if nome:
+            microregions = _fetch_microregions(nome, mesorregiao)
+
+        if __id__ is not None:
+            __id__ = int(__id__)
+            microregion = _fetch_microregion(__id__)
+            microregions = [microregion] if microregion else []
+
+        if not microregions:
             raise ValueError(
                 f"Microrregião `{nome}` não encontrada. Por favor, verifique a "
                 "acentuação. Exemplo: `Microrregiao('Vale do Itajaí')`"
             )
 
-        if len(microregion_df) > 1:
+        if len(microregions) > 1:
+            mesoregions = [row[2] for row in microregions]
             raise ValueError(
                 f"""
 A Microrregião {nome} é encontrada em diferentes Mesorregiões, 
-por favor passe uma das opções: {list(microregion_df['mesoregion'])}.
-Exemplo: Microrregiao(nome='{nome}', mesorregiao='{list(microregion_df['mesoregion'])[0]}')
+por favor passe uma das opções: {mesoregions}.
+Exemplo: Microrregiao(nome='{nome}', mesorregiao='{mesoregions[0]}')
             """
             )
 
-        if nome:
-            self.__id__ = microregion_df["id"][0]
-            self.nome = nome
-
+        self._load(microregions[0])
+
+    def _load(self, row: tuple) -> None:
+        self.__id__, self.nome, self._mesoregion, self.id_geografico = row
+        self.__cities__ = None
+
+    @classmethod
+    def many(
+        cls, ids: Iterable[int], on_missing: str = "raise"
+    ) -> List[Optional[Self]]:
+        """
+        Microrregiões of all `ids`, in the same order, resolved with a single
+        query. `on_missing` handles unknown ids: "raise", "skip" or "none"
+        """
+        return _many(ids, _int_key, _microregions_by_id, on_missing, "Microrregiões")
+
+    @classmethod
+    def _lookup_key(
+        cls,
+        nome: Optional[str] = None,
+        mesorregiao: Optional[str] = None,
+        __id__: Optional[int] = None,
+    ) -> Optional[Hashable]:
         if __id__ is not None:
-            self.__id__ = __id__
-            self.nome = microregion_df["name"][0]
+            return int(__id__)
+        if nome:
+            return (nome.lower(), mesorregiao.lower() if mesorregiao else None)
+        return None
 
-        self.id_geografico = microregion_df["geographic_id"][0]
-        self.mesorregiao = Mesorregiao(microregion_df["mesoregion"][0])
-        self.estado = self.mesorregiao.estado
-        self.macrorregiao = self.estado.macrorregiao
-        self.__cities__ = []
+    def _keys(self) -> List[Hashable]:
+        return [
+            self.__id__,
+            (self.nome.lower(), self._mesoregion.lower()),
+        ]
 
     def __str__(self) -> str:
         return self.nome
@@ -359,53 +560,103 @@ Exemplo: Microrregiao(nome='{nome}', mesorregiao='{list(microregion_df['mesoregi
     def __hash__(self) -> int:
         return self.nome
 
+    def __reduce__(self) -> tuple:
+        return Microrregiao, (None, None, self.__id__)
+
     def __eq__(self, other: Self) -> bool:
         if not isinstance(other, Microrregiao):
             return ValueError("Not a Microrregiao")
         return self.nome == other.nome
 
+    @property
+    def mesorregiao(self) -> Mesorregiao:
+        return Mesorregiao(self._mesoregion)
+
+    @property
+    def estado(self) -> Estado:
+        return self.mesorregiao.estado
+
+    @property
+    def macrorregiao(self) -> Macrorregiao:
+        return self.mesorregiao.estado.macrorregiao
+
     @property
     def municipios(self) -> List[ForwardRef("Municipio")]:
-        if not self.__cities__:
-            self._load_cities()
+        if self.__cities__ is None:
+            with loading(self):
+                if self.__cities__ is None:
+                    self._load_cities()
         return self.__cities__
 
+    def iter_municipios(self, lote: int = 1000) -> Iterator[ForwardRef("Municipio")]:
+        return _iterate(self, "__cities__", get_cities_from_microregion, lote)
+
+    @property
+    def raw(self) -> Raw:
+        return Raw(
+            self,
+            {
+                "municipios": get_cities_from_microregion,
+            },
+        )
+
     def _load_cities(self) -> None:
         self.__cities__ = get_cities_from_microregion(self)
 
 
-class Municipio:
+class Municipio(metaclass=Interned):
     geocodigo: int
     nome: str
-    macrorregiao: Macrorregiao
-    estado: Estado
-    mesorregiao: Mesorregiao
-    microrregiao: Microrregiao
-    info: dict
+
+    __slots__ = (
+        "geocodigo",
+        "nome",
+        "_microregion",
+        "_latitude",
+        "_longitude",
+        "_timezone",
+        "__weakref__",
+    )
 
     def __init__(self, geocodigo: Union[int, str]):
         self._check_geocode(str(geocodigo))
-        self.geocodigo = int(geocodigo)
 
-        try:
-            db = duckdb.connect(IBGE_DB)
-            city_df = db.sql(f"SELECT * FROM cities WHERE id = {geocodigo}").fetchdf()
-        finally:
-            db.close()
+        city = _fetch_city(int(geocodigo))
 
-        if city_df.empty:
+        if city is None:
             raise ValueError("Município não encontrado. Exemplo: `Municipio(3304557)`")
 
-        self.nome = city_df["name"][0]
-        self.microrregiao = Microrregiao(__id__=int(city_df["microregion"][0]))
-        self.mesorregiao = self.microrregiao.mesorregiao
-        self.estado = self.mesorregiao.estado
-        self.macrorregiao = self.estado.macrorregiao
-
-        self.info = {}
-        self.info["latitude"] = city_df["latitude"][0]
-        self.info["longitude"] = city_df["longitude"][0]
-        self.info["fuso_horario"] = city_df["timezone"][0]
+        self._load(city)
+
+    def _load(self, row: tuple) -> None:
+        (
+            self.geocodigo,
+            self.nome,
+            self._microregion,
+            self._latitude,
+            self._longitude,
+            self._timezone,
+        ) = row
+
+    @classmethod
+    def many(
+        cls, geocodigos: Iterable[Union[int, str]], on_missing: str = "raise"
+    ) -> List[Optional[Self]]:
+        """
+        Municípios of all `geocodigos`, in the same order, resolved with a
+        single query (repeated geocodes are looked up once). `on_missing`
+        handles unknown geocodes: "raise", "skip" or "none"
+        """
+        return _many(geocodigos, _int_key, _cities_by_id, on_missing, "Municípios")
+
+    @classmethod
+    def _lookup_key(cls, geocodigo: Union[int, str]) -> Optional[Hashable]:
+        if str(geocodigo).isdigit():
+            return int(geocodigo)
+        return None
+
+    def _keys(self) -> List[Hashable]:
+        return [self.geocodigo]
 
     def __str__(self) -> str:
         return self.nome
@@ -416,11 +667,38 @@ class Municipio:
     def __hash__(self) -> int:
         return self.geocodigo
 
+    def __reduce__(self) -> tuple:
+        return Municipio, (self.geocodigo,)
+
     def __eq__(self, other: Self) -> bool:
         if not isinstance(other, Municipio):
             return ValueError("Not a Municipio")
         return self.geocodigo == other.geocodigo
 
+    @property
+    def microrregiao(self) -> Microrregiao:
+        return Microrregiao(__id__=self._microregion)
+
+    @property
+    def mesorregiao(self) -> Mesorregiao:
+        return self.microrregiao.mesorregiao
+
+    @property
+    def estado(self) -> Estado:
+        return self.microrregiao.mesorregiao.estado
+
+    @property
+    def macrorregiao(self) -> Macrorregiao:
+        return self.microrregiao.mesorregiao.estado.macrorregiao
+
+    @property
+    def info(self) -> dict:
+        return {
+            "latitude": self._latitude,
+            "longitude": self._longitude,
+            "fuso_horario": self._timezone,
+        }
+
     def _check_geocode(self, geocodigo: str) -> None:
         if not geocodigo.isdigit():
             raise ValueError("O Geocódigo do Município deve conter apenas dígitos")
@@ -432,108 +710,445 @@ class Municipio:
             )
 
 
-def get_states_from_macroregion(macroregion: Macrorregiao) -> List[Estado]:
-    try:
-        db = duckdb.connect(IBGE_DB)
-        states_df = db.sql(
-            f"SELECT * FROM states WHERE macroregion = {macroregion.geocodigo}"
-        ).fetchdf()
-    finally:
-        db.close()
+def get_states_from_macroregion(
+    macroregion: Macrorregiao, raw: bool = False
+) -> Union[List[Estado], array]:
+    territory = index.get()
+    if territory is not None:
+        ids = territory.states_by_macroregion.get(macroregion.geocodigo, [])
+    else:
+        rows = execute("states_by_macroregion", macroregion.geocodigo).fetchall()
+        ids = [id for id, in rows]
 
-    return [Estado(geocodigo=id) for id in list(states_df["id"])]
+    if raw:
+        return array("i", ids)
 
+    return _instances(Estado, ids, _states_by_id)
 
-def get_mesoregions_from_macroregion(macroregion: Macrorregiao) -> List[Municipio]:
-    try:
-        db = duckdb.connect(IBGE_DB)
-        mesoregions_df = db.sql(
-            "SELECT mesoregions.name AS name "
-            "FROM mesoregions "
-            "JOIN states ON mesoregions.state = states.id "
-            "JOIN macroregions ON states.macroregion = macroregions.id "
-            f"WHERE macroregions.id = {macroregion.geocodigo}"
-        ).fetchdf()
-    finally:
-        db.close()
 
-    return [Mesorregiao(nome=name) for name in list(mesoregions_df["name"])]
+def get_mesoregions_from_macroregion(
+    macroregion: Macrorregiao, raw: bool = False
+) -> Union[List[Mesorregiao], List[str]]:
+    territory = index.get()
+    if territory is not None:
+        names = territory.mesoregions_by_macroregion.get(macroregion.geocodigo, [])
+    else:
+        rows = execute("mesoregions_by_macroregion", macroregion.geocodigo).fetchall()
+        names = [name for name, _ in rows]
+
+    if raw:
+        return list(names)
+
+    return _instances(Mesorregiao, names, _mesoregions_by_name, str.lower)
 
 
-def get_microregion_from_macroregion(macroregion: Macrorregiao) -> List[Municipio]:
-    try:
-        db = duckdb.connect(IBGE_DB)
-        microregions_df = db.sql(
-            "SELECT microregions.id AS id "
-            "FROM microregions "
-            "JOIN mesoregions ON microregions.mesoregion = mesoregions.name "
-            "JOIN states ON mesoregions.state = states.id "
-            "JOIN macroregions ON states.macroregion = macroregions.id "
-            f"WHERE macroregions.id = {macroregion.geocodigo}"
-        ).fetchdf()
-    finally:
-        db.close()
+def get_microregion_from_macroregion(
+    macroregion: Macrorregiao, raw: bool = False
+) -> Union[List[Microrregiao], array]:
+    territory = index.get()
+    if territory is not None:
+        ids = territory.microregions_by_macroregion.get(macroregion.geocodigo, [])
+    else:
+        rows = execute("microregions_by_macroregion", macroregion.geocodigo).fetchall()
+        ids = [id for id, _ in rows]
+
+    if raw:
+        return array("i", ids)
 
-    return [Microrregiao(__id__=id) for id in list(microregions_df["id"])]
+    return _instances(Microrregiao, ids, _microregions_by_id)
 
 
 def get_cities_from_macroregion(
     macroregion: Macrorregiao, raw: bool = False
-) -> List[Municipio]:
-    try:
-        db = duckdb.connect(IBGE_DB)
-        cities_df = db.sql(
-            "SELECT cities.id AS geocodigo "
-            "FROM cities "
-            "JOIN microregions ON cities.microregion = microregions.id "
-            "JOIN mesoregions ON microregions.mesoregion = mesoregions.name "
-            "JOIN states ON mesoregions.state = states.id "
-            "JOIN macroregions ON states.macroregion = macroregions.id "
-            f"WHERE macroregions.id = {macroregion.geocodigo}"
-        ).fetchdf()
-    finally:
-        db.close()
+) -> Union[List[Municipio], array]:
+    territory = index.get()
+    if territory is not None:
+        geocodes = territory.cities_by_macroregion.get(macroregion.geocodigo, [])
+    else:
+        rows = execute("cities_by_macroregion", macroregion.geocodigo).fetchall()
+        geocodes = [geocode for geocode, in rows]
 
     if raw:
-        return list(cities_df["geocodigo"])
+        return array("i", geocodes)
 
-    return [Municipio(geocode) for geocode in list(cities_df["geocodigo"])]
+    return _instances(Municipio, geocodes, _cities_by_id)
 
 
-def get_mesoregions_from_state(state: Estado) -> List[Mesorregiao]:
-    try:
-        db = duckdb.connect(IBGE_DB)
-        mesoregions_df = db.sql(
-            f"SELECT * FROM mesoregions WHERE state = {state.geocodigo}"
-        ).fetchdf()
-    finally:
-        db.close()
+def get_mesoregions_from_state(
+    state: Estado, raw: bool = False
+) -> Union[List[Mesorregiao], List[str]]:
+    territory = index.get()
+    if territory is not None:
+        names = territory.mesoregions_by_state.get(state.geocodigo, [])
+    else:
+        rows = execute("mesoregions_by_state", state.geocodigo).fetchall()
+        names = [name for name, in rows]
 
-    return [Mesorregiao(nome=name) for name in list(mesoregions_df["name"])]
+    if raw:
+        return list(names)
 
+    return _instances(Mesorregiao, names, _mesoregions_by_name, str.lower)
 
-def get_microregions_from_mesoregion(mesoregion: Mesorregiao) -> List[Microrregiao]:
-    try:
-        db = duckdb.connect(IBGE_DB)
-        microregions_df = db.sql(
-            f"SELECT * FROM microregions WHERE mesoregion = '{mesoregion.nome}'"
-        ).fetchdf()
-    finally:
-        db.close()
 
-    return [
-        Microrregiao(nome=name, mesorregiao=mesoregion.nome)
-        for name in list(microregions_df["name"])
-    ]
+def get_microregions_from_state(
+    state: Estado, raw: bool = False
+) -> Union[List[Microrregiao], array]:
+    territory = index.get()
+    if territory is not None:
+        ids = [
+            id
+            for name in territory.mesoregions_by_state.get(state.geocodigo, [])
+            for id in territory.microregions_by_mesoregion.get(name, [])
+        ]
+    else:
+        rows = execute("microregions_by_state", state.geocodigo).fetchall()
+        ids = [row[0] for row in rows]
 
+    if raw:
+        return array("i", ids)
+
+    return _instances(Microrregiao, ids, _microregions_by_id)
+
+
+def get_cities_from_state(
+    state: Estado, raw: bool = False
+) -> Union[List[Municipio], array]:
+    territory = index.get()
+    if territory is not None:
+        geocodes = [
+            geocode
+            for name in territory.mesoregions_by_state.get(state.geocodigo, [])
+            for id in territory.microregions_by_mesoregion.get(name, [])
+            for geocode in territory.cities_by_microregion.get(id, [])
+        ]
+    else:
+        rows = execute("cities_by_state", state.geocodigo).fetchall()
+        geocodes = [geocode for geocode, in rows]
+
+    if raw:
+        return array("i", geocodes)
+
+    return _instances(Municipio, geocodes, _cities_by_id)
 
-def get_cities_from_microregion(microregion: Microrregiao) -> List[Municipio]:
-    try:
-        db = duckdb.connect(IBGE_DB)
-        cities_df = db.sql(
-            f"SELECT * FROM cities WHERE microregion = {microregion.__id__}"
-        ).fetchdf()
-    finally:
-        db.close()
 
-    return [Municipio(geocode) for geocode in list(cities_df["id"])]
+def get_microregions_from_mesoregion(
+    mesoregion: Mesorregiao, raw: bool = False
+) -> Union[List[Microrregiao], array]:
+    territory = index.get()
+    if territory is not None:
+        ids = territory.microregions_by_mesoregion.get(mesoregion.nome, [])
+    else:
+        rows = execute("microregions_by_mesoregion", mesoregion.nome).fetchall()
+        ids = [id for id, in rows]
+
+    if raw:
+        return array("i", ids)
+
+    return _instances(Microrregiao, ids, _microregions_by_id)
+
+
+def get_cities_from_mesoregion(
+    mesoregion: Mesorregiao, raw: bool = False
+) -> Union[List[Municipio], array]:
+    territory = index.get()
+    if territory is not None:
+        geocodes = [
+            geocode
+            for id in territory.microregions_by_mesoregion.get(mesoregion.nome, [])
+            for geocode in territory.cities_by_microregion.get(id, [])
+        ]
+    else:
+        rows = execute("cities_by_mesoregion", mesoregion.nome).fetchall()
+        geocodes = [geocode for geocode, in rows]
+
+    if raw:
+        return array("i", geocodes)
+
+    return _instances(Municipio, geocodes, _cities_by_id)
+
+
+def get_cities_from_microregion(
+    microregion: Microrregiao, raw: bool = False
+) -> Union[List[Municipio], array]:
+    territory = index.get()
+    if territory is not None:
+        geocodes = territory.cities_by_microregion.get(microregion.__id__, [])
+    else:
+        rows = execute("cities_by_microregion", microregion.__id__).fetchall()
+        geocodes = [geocode for geocode, in rows]
+
+    if raw:
+        return array("i", geocodes)
+
+    return _instances(Municipio, geocodes, _cities_by_id)
+
+
+def _fetch_state(
+    geocodigo: Optional[Union[int, str]] = None, uf: Optional[str] = None
+) -> Optional[tuple]:
+    territory = index.get()
+    if territory is not None:
+        return territory.state(geocodigo=geocodigo, uf=uf)
+
+    if geocodigo:
+        return execute("state_by_id", int(geocodigo)).fetchone()
+    if uf:
+        return execute("state_by_uf", uf).fetchone()
+    return None
+
+
+def _fetch_mesoregion(nome: str) -> Optional[tuple]:
+    territory = index.get()
+    if territory is not None:
+        mesoregion = territory.mesoregion(nome)
+    else:
+        mesoregion = execute("mesoregion_by_name", nome).fetchone()
+
+    if mesoregion is None:
+        # Falls back to the name without accents, e.g. "vale do itajai"
+        matches = search.load().exact(nome, "mesorregiao")
+        if len(matches) == 1:
+            return _fetch_mesoregion(matches[0].chave)
+    return mesoregion
+
+
+def _fetch_microregion(id: int) -> Optional[tuple]:
+    territory = index.get()
+    if territory is not None:
+        return territory.microregion(id)
+
+    return execute("microregion_by_id", id).fetchone()
+
+
+def _fetch_microregions(nome: str, mesorregiao: Optional[str] = None) -> List[tuple]:
+    territory = index.get()
+    if territory is not None:
+        microregions = territory.microregions_named(nome, mesorregiao)
+    elif mesorregiao:
+        microregions = execute(
+            "microregions_by_name_and_mesoregion", nome, mesorregiao
+        ).fetchall()
+    else:
+        microregions = execute("microregions_by_name", nome).fetchall()
+
+    if not microregions:
+        # Falls back to the names without accents
+        matches = search.load().exact(nome, "microrregiao")
+        microregions = [_fetch_microregion(match.chave) for match in matches]
+        if mesorregiao:
+            microregions = [
+                row
+                for row in microregions
+                if search.fold(row[2]) == search.fold(mesorregiao)
+            ]
+    return microregions
+
+
+def _fetch_city(geocodigo: int) -> Optional[tuple]:
+    territory = index.get()
+    if territory is not None:
+        return territory.city(geocodigo)
+
+    return execute("city_by_id", geocodigo).fetchone()
+
+
+def _int_key(value: Union[int, str]) -> Optional[int]:
+    value = str(value).strip()
+    return int(value) if value.isdigit() else None
+
+
+def _many(
+    keys: Iterable,
+    normalize: Callable[[Hashable], Optional[Hashable]],
+    resolve: Callable[[set], Dict[Hashable, object]],
+    on_missing: str,
+    label: str,
+) -> list:
+    if on_missing not in ("raise", "skip", "none"):
+        raise ValueError("`on_missing` deve ser 'raise', 'skip' ou 'none'")
+
+    keys = list(keys)
+    normalized = [normalize(key) for key in keys]
+    found = resolve({key for key in normalized if key is not None})
+
+    if on_missing == "raise":
+        missing = [key for key, norm in zip(keys, normalized) if norm not in found]
+        if missing:
+            raise ValueError(
+                f"{label} não encontrados: {list(dict.fromkeys(missing))[:10]}"
+            )
+
+    instances = [found.get(norm) for norm in normalized]
+
+    if on_missing == "skip":
+        return [instance for instance in instances if instance is not None]
+    return instances
+
+
+def _instances(
+    cls: type,
+    keys: list,
+    resolve: Callable[[set], Dict[Hashable, object]],
+    normalize: Callable[[Hashable], Hashable] = lambda key: key,
+) -> list:
+    """
+    Instances of `cls` for `keys` (all known to exist), building the ones not
+    cached with a single `resolve` call instead of one query each
+    """
+    found = {key: cls.cached(key) for key in keys}
+    missing = {normalize(key) for key, instance in found.items() if instance is None}
+    if missing:
+        resolved = resolve(missing)
+        for key, instance in found.items():
+            if instance is None:
+                found[key] = resolved[normalize(key)]
+    return [found[key] for key in keys]
+
+
+def _wire(children: list, parent: str, cls: type, collection: str) -> None:
+    """
+    Fills the `collection` of each `cls` parent of `children` (found by
+    their `parent` attribute) that isn't loaded yet, so loading a subtree
+    also loads the collections below it. `children` must hold every child
+    of those parents, in order.
+    """
+    groups: Dict[Hashable, list] = {}
+    for child in children:
+        groups.setdefault(getattr(child, parent), []).append(child)
+
+    for key, group in groups.items():
+        instance = cls.cached(key)
+        if instance is not None and getattr(instance, collection) is None:
+            with loading(instance):
+                if getattr(instance, collection) is None:
+                    setattr(instance, collection, group)
+
+
+def _iterate(
+    unit: object, collection: str, helper: Callable, size: int
+) -> Iterator[object]:
+    """
+    Streams a collection of `unit` without building the whole list: the
+    children's keys are fetched first and the instances built `size` at a
+    time, so no result is left pending on the thread's cursor between batches
+    """
+    loaded = getattr(unit, collection)
+    if loaded is not None:
+        yield from loaded
+        return
+
+    cls, resolve, normalize = _BATCHES[collection]
+    keys = helper(unit, raw=True)
+    for start in range(0, len(keys), size):
+        yield from _instances(cls, keys[start : start + size], resolve, normalize)
+
+
+def _from_joined_rows(rows: List[tuple], chain: List[tuple]) -> list:
+    """
+    Builds instances from rows holding the columns of each class in `chain`
+    ((class, column count) pairs, from the requested level up to Estado),
+    creating parents first so children find them interned
+    """
+    instances = []
+    for row in rows:
+        end = len(row)
+        for cls, width in reversed(chain):
+            instance = cls._from_row(row[end - width : end])
+            end -= width
+        instances.append(instance)
+    return instances
+
+
+def _states_by_id(ids: set) -> Dict[int, Estado]:
+    territory = index.get()
+    if territory is not None:
+        rows = [territory.states[id] for id in ids if id in territory.states]
+    else:
+        rows = execute("states_by_ids", list(ids)).fetchall()
+
+    states = _from_joined_rows(rows, [(Estado, 4)])
+    return {state.geocodigo: state for state in states}
+
+
+def _mesoregions_by_name(names: set) -> Dict[str, Mesorregiao]:
+    territory = index.get()
+    if territory is not None:
+        rows = []
+        for name in names:
+            mesoregion = territory.mesoregions.get(name)
+            if mesoregion:
+                rows.append(mesoregion + territory.states[mesoregion[1]])
+    else:
+        rows = execute("mesoregions_by_names", list(names)).fetchall()
+
+    mesoregions = _from_joined_rows(rows, [(Mesorregiao, 3), (Estado, 4)])
+    return {mesoregion.nome.lower(): mesoregion for mesoregion in mesoregions}
+
+
+def _microregions_by_id(ids: set) -> Dict[int, Microrregiao]:
+    territory = index.get()
+    if territory is not None:
+        rows = []
+        for id in ids:
+            microregion = territory.microregions.get(id)
+            if microregion:
+                mesoregion = territory.mesoregions[microregion[2].lower()]
+                state = territory.states[mesoregion[1]]
+                rows.append(microregion + mesoregion + state)
+    else:
+        rows = execute("microregions_by_ids", list(ids)).fetchall()
+
+    microregions = _from_joined_rows(
+        rows, [(Microrregiao, 4), (Mesorregiao, 3), (Estado, 4)]
+    )
+    return {microregion.__id__: microregion for microregion in microregions}
+
+
+def _cities_by_id(geocodes: set) -> Dict[int, Municipio]:
+    territory = index.get()
+    if territory is not None:
+        rows = []
+        for geocode in geocodes:
+            city = territory.cities.get(geocode)
+            if city:
+                microregion = territory.microregions[city[2]]
+                mesoregion = territory.mesoregions[microregion[2].lower()]
+                state = territory.states[mesoregion[1]]
+                rows.append(city + microregion + mesoregion + state)
+    else:
+        rows = execute("cities_by_ids", list(geocodes)).fetchall()
+
+    cities = _from_joined_rows(
+        rows, [(Municipio, 6), (Microrregiao, 4), (Mesorregiao, 3), (Estado, 4)]
+    )
+    return {city.geocodigo: city for city in cities}
+
+
+# Class and batch lookup of each collection's instances, by collection slot
+_BATCHES: Dict[str, tuple] = {
+    "__states__": (Estado, _states_by_id, lambda id: id),
+    "__mesoregions__": (Mesorregiao, _mesoregions_by_name, str.lower),
+    "__microregions__": (Microrregiao, _microregions_by_id, lambda id: id),
+    "__cities__": (Municipio, _cities_by_id, lambda geocode: geocode),
+}
+
+
+def __getattr__(name: str):
+    # pandas is only imported when a dataframe API is first used
+    if name in ("enrich", "resolve", "rollup"):
+        from ibge.brasil import frames
+
+        return getattr(frames, name)
+    # as is numpy, by the geographic ones
+    if name in (
+        "nearest",
+        "nearest_city",
+        "within",
+        "haversine",
+        "distance_matrix",
+        "neighbors",
+    ):
+        from ibge.brasil import geo
+
+        return getattr(geo, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,126 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+from ibge.brasil import Macrorregiao, Estado, Mesorregiao, Microrregiao, Municipio
+
+
+MAX_WORKERS = 4
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+_inflight: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Future] = {}
+
+
+def executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=MAX_WORKERS, thread_name_prefix="ibge"
+                )
+    return _executor
+
+
+def configure(max_workers: int) -> None:
+    """
+    Sets how many lookups may run at once. A new pool is created on use;
+    lookups already on the old one finish there, without being waited for.
+    """
+    global MAX_WORKERS, _executor
+    with _lock:
+        MAX_WORKERS = max_workers
+        previous, _executor = _executor, None
+    if previous is not None:
+        previous.shutdown(wait=False)
+
+
+def shutdown() -> None:
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+async def run(function: Callable, *args, **kwargs):
+    """Runs `function` on the pool, keeping the caller's context (e.g. traces)"""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(function, *args, **kwargs)
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor(), context.run, call)
+
+
+async def coalesce(key: Hashable, function: Callable, *args, **kwargs):
+    """
+    Runs `function` on the pool unless a call with the same `key` is already
+    running in this event loop, in which case its result is awaited instead
+    """
+    loop = asyncio.get_running_loop()
+    future = _inflight.get((loop, key))
+
+    if future is None:
+        future = asyncio.ensure_future(run(function, *args, **kwargs))
+        _inflight[(loop, key)] = future
+        future.add_done_callback(lambda _: _inflight.pop((loop, key), None))
+
+    # One caller being cancelled must not cancel the others
+    return await asyncio.shield(future)
+
+
+async def get(cls: type, *args, **kwargs):
+    """`cls(*args, **kwargs)`, answered from the cache without the pool if possible"""
+    key = cls._lookup_key(*args, **kwargs)
+    if key is None:
+        return await run(cls, *args, **kwargs)
+
+    instance = cls.cached(key)
+    if instance is not None:
+        return instance
+    return await coalesce((cls, key), cls, *args, **kwargs)
+
+
+async def many(
+    cls: type, keys: Iterable, on_missing: str = "raise"
+) -> List[Optional[object]]:
+    return await run(cls.many, list(keys), on_missing=on_missing)
+
+
+async def collection(unit: object, name: str, raw: bool = False):
+    """A collection property of `unit` (e.g. "municipios"), or its raw keys"""
+    key = (type(unit), unit._keys()[0], name, raw)
+    if raw:
+        return await coalesce(key, getattr, unit.raw, name)
+    return await coalesce(key, getattr, unit, name)
+
+
+async def macrorregiao(
+    nome: Optional[str] = None, geocodigo: Optional[Union[int, str]] = None
+) -> Macrorregiao:
+    return await get(Macrorregiao, nome=nome, geocodigo=geocodigo)
+
+
+async def estado(
+    geocodigo: Optional[Union[int, str]] = None, uf: Optional[str] = None
+) -> Estado:
+    return await get(Estado, geocodigo=geocodigo, uf=uf)
+
+
+async def mesorregiao(nome: str) -> Mesorregiao:
+    return await get(Mesorregiao, nome)
+
+
+async def microrregiao(
+    nome: Optional[str] = None,
+    mesorregiao: Optional[str] = None,
+    __id__: Optional[int] = None,
+) -> Microrregiao:
+    return await get(Microrregiao, nome=nome, mesorregiao=mesorregiao, __id__=__id__)
+
+
+async def municipio(geocodigo: Union[int, str]) -> Municipio:
+    return await get(Municipio, geocodigo)
@@ -0,0 +1,115 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Optional
+from weakref import WeakValueDictionary
+
+from ibge.sql import tracing
+
+
+MAXSIZE = 8192
+STRIPES = 64
+
+_lock = threading.RLock()
+_recent: OrderedDict = OrderedDict()
+_classes: List[type] = []
+
+
+class Interned(type):
+    """
+    Metaclass of the territorial classes: instantiating with any key that
+    identifies an already built unit returns that same instance. Lookup keys
+    come from `cls._lookup_key(*args, **kwargs)` (`None` when the arguments
+    can't be resolved without querying) and every key an instance answers to
+    from `instance._keys()`.
+
+    Instances are held by weak references, plus strong references to the
+    `MAXSIZE` most recently used ones so short-lived objects are reused too.
+    """
+
+    def __init__(cls, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        cls._instances = WeakValueDictionary()
+        cls._loading = [threading.RLock() for _ in range(STRIPES)]
+        _classes.append(cls)
+
+    def __call__(cls, *args, **kwargs):
+        key = cls._lookup_key(*args, **kwargs)
+
+        if key is not None:
+            instance = cls._instances.get(key)
+            if instance is not None:
+                tracing.count("cache_hits")
+                _touch(cls, key, instance)
+                return instance
+
+        tracing.count("cache_misses")
+        return intern(super().__call__(*args, **kwargs), key)
+
+    def cached(cls, key: Hashable) -> Optional[object]:
+        return cls._instances.get(key)
+
+    def _from_row(cls, row: tuple) -> object:
+        """
+        Instance for a database row (whose first column is the canonical key),
+        built without querying when it isn't cached yet
+        """
+        instance = cls._instances.get(row[0])
+        if instance is not None:
+            tracing.count("cache_hits")
+            _touch(cls, row[0], instance)
+            return instance
+
+        tracing.count("cache_misses")
+        instance = cls.__new__(cls)
+        instance._load(row)
+        return intern(instance)
+
+
+def intern(instance: object, key: Optional[Hashable] = None) -> object:
+    """
+    Registers `instance` under all its keys, returning the instance already
+    registered for the same unit if another thread got there first
+    """
+    cls = type(instance)
+    keys = instance._keys()
+
+    with _lock:
+        existing = cls._instances.get(keys[0])
+        if existing is not None:
+            instance = existing
+
+        for k in keys:
+            cls._instances[k] = instance
+        if key is not None:
+            cls._instances[key] = instance
+
+        _touch(cls, keys[0], instance)
+
+    return instance
+
+
+def loading(instance: object) -> threading.RLock:
+    """
+    Lock guarding the lazy collections of `instance`, so concurrent threads
+    load each one only once. Locks are striped per class and a collection
+    only loads those of lower levels, so they're always taken in the same
+    order.
+    """
+    locks = type(instance)._loading
+    return locks[hash(instance._keys()[0]) % STRIPES]
+
+
+def _touch(cls: type, key: Hashable, instance: object) -> None:
+    with _lock:
+        _recent[(cls, key)] = instance
+        _recent.move_to_end((cls, key))
+        while len(_recent) > MAXSIZE:
+            _recent.popitem(last=False)
+
+
+def clear_cache() -> None:
+    """Forgets every interned territorial object"""
+    with _lock:
+        _recent.clear()
+        for cls in _classes:
+            cls._instances.clear()
@@ -0,0 +1,386 @@
+import time
+from typing import Dict, List, Optional, Union
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError as error:  # pragma: no cover
+    raise ImportError(
+        "As funções de DataFrame requerem pandas: pip install ibge-utils[pandas]"
+    ) from error
+
+from ibge.sql import cursor, tracing
+from ibge.brasil import search
+
+
+FIELDS: Dict[str, str] = {
+    "municipio": "territory.city_name",
+    "microrregiao": "territory.microregion_name",
+    "id_microrregiao": "territory.microregion_id",
+    "mesorregiao": "territory.mesoregion_name",
+    "id_mesorregiao": "territory.mesoregion_id",
+    "estado": "territory.state_name",
+    "uf": "territory.uf",
+    "id_estado": "territory.state_id",
+    "macrorregiao": "territory.macroregion_name",
+    "id_macrorregiao": "territory.macroregion_id",
+    "latitude": "CAST(CAST(cities.latitude AS VARCHAR) AS DOUBLE)",
+    "longitude": "CAST(CAST(cities.longitude AS VARCHAR) AS DOUBLE)",
+    "fuso_horario": "cities.timezone",
+}
+
+DEFAULT_FIELDS = [
+    "uf",
+    "estado",
+    "mesorregiao",
+    "microrregiao",
+    "macrorregiao",
+    "latitude",
+    "longitude",
+    "fuso_horario",
+]
+
+HIERARCHY = "FROM territory JOIN cities ON territory.city_id = cities.id"
+
+QUALITY = pd.CategoricalDtype(["exato", "aproximado", "ambiguo", "nao_encontrado"])
+
+# Id, name and UF columns of each rollup level, from the finest
+LEVELS: Dict[str, tuple] = {
+    "municipio": ("territory.city_id", "territory.city_name", "territory.uf"),
+    "microrregiao": (
+        "territory.microregion_id",
+        "territory.microregion_name",
+        "territory.uf",
+    ),
+    "mesorregiao": (
+        "territory.mesoregion_id",
+        "territory.mesoregion_name",
+        "territory.uf",
+    ),
+    "estado": ("territory.state_id", "territory.state_name", "territory.uf"),
+    "macrorregiao": ("territory.macroregion_id", "territory.macroregion_name"),
+    "brasil": (),
+}
+
+DEFAULT_LEVELS = ["microrregiao", "mesorregiao", "estado", "macrorregiao"]
+
+AGGREGATES: Dict[str, str] = {
+    "sum": "SUM",
+    "mean": "AVG",
+    "median": "MEDIAN",
+    "min": "MIN",
+    "max": "MAX",
+    "count": "COUNT",
+    "std": "STDDEV_SAMP",
+}
+
+
+def enrich(df, column: str = "geocodigo", fields: Optional[List[str]] = None):
+    """
+    Annotates a pandas DataFrame or pyarrow Table holding city geocodes in
+    `column` with the requested `fields` of their territorial hierarchy (see
+    `FIELDS`), returning a new frame of the same type with the same row order.
+    Unknown geocodes get missing values.
+
+    The hierarchy is joined in DuckDB once; rows are then matched by a
+    vectorized positional lookup, so no Python object is built per row and
+    names come back as categoricals.
+    """
+    fields = list(DEFAULT_FIELDS if fields is None else fields)
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown:
+        raise ValueError(f"Campos desconhecidos: {unknown}. Opções: {list(FIELDS)}")
+
+    geocodes = _values(df, column)
+    if geocodes.dtype.kind not in "iuf":
+        geocodes = pd.to_numeric(pd.Series(geocodes), errors="coerce").to_numpy()
+
+    lookup = _hierarchy(fields)
+    positions = pd.Index(lookup.pop("geocodigo")).get_indexer(geocodes)
+    missing = positions < 0
+
+    columns = {
+        field: _take(values, positions, missing) for field, values in lookup.items()
+    }
+    return _assign(df, columns)
+
+
+def resolve(
+    df,
+    column: str = "municipio",
+    uf: Optional[str] = None,
+    output: str = "geocodigo",
+    minimo: float = 0.35,
+):
+    """
+    Geocodes the city names in `column` of a pandas DataFrame or pyarrow
+    Table, optionally disambiguated by the UF or state name in column `uf`.
+    Adds `output` with the geocodes, `qualidade` ("exato", "aproximado",
+    "ambiguo" or "nao_encontrado") and `pontuacao` (1.0 for exact matches,
+    the `buscar()` score for approximate ones), keeping the row order.
+
+    Names are compared without accents, case or punctuation. Each distinct
+    (name, UF) pair is normalized and joined against all cities once; only
+    the pairs left unmatched go through fuzzy search, accepted when scoring
+    at least `minimo`.
+    """
+    names = pd.Series(_values(df, column), dtype=object)
+    ufs = pd.Series(_values(df, uf) if uf else "", index=names.index, dtype=object)
+    pairs = pd.MultiIndex.from_arrays([names.fillna(""), ufs.fillna("")])
+    codes, uniques = pairs.factorize()
+
+    pending = pd.DataFrame(
+        {
+            "nome": [search.fold(name) for name in uniques.get_level_values(0)],
+            "uf": [_uf(value) for value in uniques.get_level_values(1)],
+        }
+    )
+    matches = _exact_matches(pending)
+
+    # Homonyms stay without a geocode, as in the fuzzy ambiguous case below
+    geocodes = matches["geocodigo"].where(matches["candidatos"] == 1)
+    geocodes = geocodes.to_numpy(dtype="float64")
+    quality = np.where(
+        matches["candidatos"] == 1,
+        "exato",
+        np.where(matches["candidatos"] > 1, "ambiguo", "nao_encontrado"),
+    ).astype(object)
+    scores = np.where(matches["candidatos"] == 1, 1.0, np.nan)
+
+    index = search.load()
+    for i in np.flatnonzero(matches["candidatos"].to_numpy() == 0):
+        name, state = pending.at[i, "nome"], pending.at[i, "uf"]
+        if not name:
+            continue
+        found = index.search(name, nivel="municipio", uf=state or None, limite=2)
+        if not found or found[0].pontuacao < minimo:
+            continue
+        if len(found) > 1 and found[1].pontuacao == found[0].pontuacao:
+            quality[i] = "ambiguo"
+            continue
+        geocodes[i], quality[i], scores[i] = (
+            found[0].chave,
+            "aproximado",
+            found[0].pontuacao,
+        )
+
+    missing = np.isnan(geocodes)
+    geocodes = np.where(missing, 0, geocodes).astype("int32")
+    columns = {
+        output: pd.arrays.IntegerArray(geocodes[codes], missing[codes]),
+        "qualidade": pd.Categorical(quality[codes], dtype=QUALITY),
+        "pontuacao": scores[codes],
+    }
+    return _assign(df, columns)
+
+
+def rollup(
+    df,
+    column: str = "geocodigo",
+    values: Optional[Union[str, List[str]]] = None,
+    levels: Optional[List[str]] = None,
+    aggs: Optional[Dict[str, Union[str, List[str]]]] = None,
+):
+    """
+    Aggregates the `values` columns (one or a list, by default the numeric
+    ones) of a pandas DataFrame or pyarrow Table of city geocodes in
+    `column` up to each of the territorial `levels` (see `LEVELS`),
+    with `aggs` mapping columns to one or more of `AGGREGATES` ("sum" by
+    default). Returns a frame of the same type with one row per unit:
+    `nivel`, `id`, `nome` and `uf`, followed by the aggregates, named after
+    their column (or `<column>_<agg>` when it has several). Rows whose
+    geocode in `column` isn't a known city are left out.
+
+    Every level is computed by a single DuckDB `GROUPING SETS` query over
+    the frame joined to the territorial hierarchy.
+    """
+    levels = list(DEFAULT_LEVELS if levels is None else levels)
+    unknown = [level for level in levels if level not in LEVELS]
+    if unknown or not levels:
+        raise ValueError(f"Níveis desconhecidos: {unknown}. Opções: {list(LEVELS)}")
+
+    columns = df.column_names if _is_arrow(df) else list(df.columns)
+    if isinstance(values, str):
+        values = [values]
+    elif values is None:
+        values = [name for name in (aggs or columns) if name != column]
+        if aggs is None:
+            values = [name for name in values if _numeric(df, name)]
+    missing = [name for name in [column, *values, *(aggs or {})] if name not in columns]
+    if missing:
+        raise ValueError(f"Colunas não encontradas: {missing}")
+
+    aggregates = []
+    for name in values:
+        functions = (aggs or {}).get(name, "sum")
+        single = isinstance(functions, str)
+        for function in [functions] if single else functions:
+            if function not in AGGREGATES:
+                raise ValueError(
+                    f"Agregação desconhecida: {function!r}. Opções: {list(AGGREGATES)}"
+                )
+            alias = name if single else f"{name}_{function}"
+            aggregate = f"{AGGREGATES[function]}(data.{_quote(name)})"
+            if function == "sum" and _values(df, name).dtype.kind in "iu":
+                aggregate = f"CAST({aggregate} AS BIGINT)"  # not HUGEINT
+            aggregates.append(f"{aggregate} AS {_quote(alias)}")
+
+    # Each grouping set holds one level's columns, the others come back NULL
+    levels = [level for level in LEVELS if level in levels]
+    grouped = [level for level in levels if LEVELS[level]]
+    nivel, rank = "'brasil'", str(len(levels))
+    if grouped:
+        nivel = _case(grouped, lambda level: f"'{level}'", nivel)
+        rank = _case(grouped, lambda level: str(levels.index(level)), rank)
+    ids = "".join(f"{LEVELS[level][0]}, " for level in grouped)
+    names = "".join(f"{LEVELS[level][1]}, " for level in grouped)
+    by_state = any("territory.uf" in LEVELS[level] for level in grouped)
+    sets = ", ".join(f"({', '.join(LEVELS[level])})" for level in levels)
+    query = (
+        f"SELECT {nivel} AS nivel, "
+        f"COALESCE({ids}NULL) AS id, COALESCE({names}'Brasil') AS nome, "
+        f"{'territory.uf' if by_state else 'NULL'} AS uf, {', '.join(aggregates)} "
+        f"FROM rollup_data AS data JOIN territory "
+        f"ON TRY_CAST(data.{_quote(column)} AS INTEGER) = territory.city_id "
+        f"GROUP BY GROUPING SETS ({sets}) "
+        f"ORDER BY {rank}, id"
+    )
+
+    db = cursor()
+    start = time.perf_counter()
+    db.register("rollup_data", df)
+    try:
+        result = db.sql(query)
+        if _is_arrow(df):
+            table = result.arrow()
+            rows = table.num_rows
+        else:
+            table = result.df()
+            table["nivel"] = pd.Categorical(table["nivel"], categories=levels)
+            table["id"] = table["id"].astype("Int32")
+            rows = len(table)
+    finally:
+        db.unregister("rollup_data")
+
+    if tracing.enabled():
+        seconds = time.perf_counter() - start
+        tracing.record(
+            tracing.Query("rollup", query, (), seconds, rows, tracing.caller())
+        )
+    return table
+
+
+def _hierarchy(fields: List[str]) -> Dict[str, np.ndarray]:
+    selection = ", ".join(f"{FIELDS[field]} AS {field}" for field in fields)
+    query = f"SELECT territory.city_id AS geocodigo, {selection} {HIERARCHY}"
+    start = time.perf_counter()
+    columns = cursor().sql(query).fetchnumpy()
+
+    if tracing.enabled():
+        seconds = time.perf_counter() - start
+        rows = len(columns["geocodigo"])
+        tracing.record(
+            tracing.Query("enrich", query, (), seconds, rows, tracing.caller())
+        )
+
+    hierarchy = {"geocodigo": columns["geocodigo"]}
+    for field in fields:
+        values = columns[field]
+        if values.dtype == object:
+            values = pd.Categorical(values)
+        hierarchy[field] = values
+    return hierarchy
+
+
+def _take(values, positions: np.ndarray, missing: np.ndarray):
+    if isinstance(values, pd.Categorical):
+        codes = values.codes[positions]
+        codes[missing] = -1
+        return pd.Categorical.from_codes(codes, dtype=values.dtype)
+
+    taken = values[positions]
+    if taken.dtype.kind == "f":
+        taken[missing] = np.nan
+        return taken
+    return pd.arrays.IntegerArray(taken.astype("int32"), missing)
+
+
+def _values(df, column: str) -> np.ndarray:
+    if _is_arrow(df):
+        return df.column(column).to_numpy()
+    return df[column].to_numpy()
+
+
+def _is_arrow(df) -> bool:
+    return type(df).__module__.startswith("pyarrow")
+
+
+def _assign(df, columns: Dict[str, object]):
+    if not _is_arrow(df):
+        return df.assign(**columns)
+
+    import pyarrow as pa
+
+    table = df
+    for field, values in columns.items():
+        array = pa.array(values, from_pandas=True)
+        if field in table.column_names:
+            table = table.set_column(table.column_names.index(field), field, array)
+        else:
+            table = table.append_column(field, array)
+    return table
+
+
+def _case(levels: List[str], value, default: str) -> str:
+    """SQL picking `value(level)` for the level grouped in each row"""
+    cases = " ".join(
+        f"WHEN GROUPING({LEVELS[level][0]}) = 0 THEN {value(level)}" for level in levels
+    )
+    return f"CASE {cases} ELSE {default} END"
+
+
+def _numeric(df, column: str) -> bool:
+    return _values(df, column).dtype.kind in "iuf"
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _uf(value: str) -> str:
+    """UF of a state given by its UF or name, or "" when unknown"""
+    folded = search.fold(value)
+    if not folded:
+        return ""
+    states = search.load().exact(folded, "estado")
+    if states:
+        return states[0].uf
+    return folded.upper() if len(folded) == 2 else ""
+
+
+def _exact_matches(pending: pd.DataFrame) -> pd.DataFrame:
+    """
+    Geocode and number of cities named like each pending (name, uf) pair,
+    ignoring the UF when it's empty
+    """
+    index = search.load()
+    cities = pd.DataFrame(
+        [
+            (folded, entry[3], entry[1])
+            for entry, folded in zip(index.entries, index.folded)
+            if entry[0] == "municipio"
+        ],
+        columns=["nome", "uf", "geocodigo"],
+    )
+    by_name = cities.groupby("nome")["geocodigo"].agg(["first", "size"])
+    by_name_uf = cities.groupby(["nome", "uf"])["geocodigo"].agg(["first", "size"])
+
+    with_uf = pending.join(by_name_uf, on=["nome", "uf"])
+    without_uf = pending.join(by_name, on="nome")
+    matches = with_uf.where(pending["uf"] != "", without_uf)
+    return pd.DataFrame(
+        {
+            "geocodigo": matches["first"],
+            "candidatos": matches["size"].fillna(0).astype(int),
+        }
+    )
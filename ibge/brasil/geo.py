@@ -0,0 +1,452 @@
+import threading
+from typing import Iterable, List, NamedTuple, Optional, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError as error:  # pragma: no cover
+    raise ImportError(
+        "As funções geográficas requerem numpy: pip install ibge-utils[geo]"
+    ) from error
+
+from ibge.sql import execute
+from ibge.brasil import index
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+class DistanceMatrix(NamedTuple):
+    origens: np.ndarray
+    destinos: np.ndarray
+    distancias: np.ndarray
+
+
+def haversine(latitude1, longitude1, latitude2, longitude2) -> np.ndarray:
+    """Great-circle distance in km between points in degrees, broadcasting"""
+    lat1, lon1, lat2, lon2 = (
+        np.radians(np.asarray(value, dtype="float64"))
+        for value in (latitude1, longitude1, latitude2, longitude2)
+    )
+    return _haversine(lat1, lon1, np.cos(lat1), lat2, lon2, np.cos(lat2))
+
+
+def _haversine(lat1, lon1, cos1, lat2, lon2, cos2) -> np.ndarray:
+    # Radians, with the latitude cosines computed once by the caller
+    a = np.sin((lat2 - lat1) / 2) ** 2 + cos1 * cos2 * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def unit_vectors(latitudes, longitudes) -> np.ndarray:
+    lat = np.radians(np.asarray(latitudes, dtype="float64"))
+    lon = np.radians(np.asarray(longitudes, dtype="float64"))
+    return np.stack(
+        [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1
+    )
+
+
+class SpatialIndex:
+    """
+    City seats on a latitude/longitude grid of `cell` degrees. For each k,
+    every cell keeps the cities that can be among the k nearest of any point
+    inside it (those within the k-th nearest distance from the cell center
+    plus its diagonal), so a batch query only compares each point with its
+    cell's candidates. Points outside the grid are compared with all cities.
+    """
+
+    geocodes: np.ndarray
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+
+    def __init__(self, geocodes, latitudes, longitudes, cell: float = 0.5):
+        self.geocodes = np.asarray(geocodes, dtype="int32")
+        self.latitudes = np.asarray(latitudes, dtype="float64")
+        self.longitudes = np.asarray(longitudes, dtype="float64")
+        self.points = unit_vectors(self.latitudes, self.longitudes)
+        self.cell = cell
+        self._sorted = np.argsort(self.geocodes, kind="stable")
+
+        self.origin = (
+            np.floor(self.latitudes.min()) - cell,
+            np.floor(self.longitudes.min()) - cell,
+        )
+        self.shape = (
+            int(np.ceil((self.latitudes.max() - self.origin[0]) / cell)) + 2,
+            int(np.ceil((self.longitudes.max() - self.origin[1]) / cell)) + 2,
+        )
+        self._candidates = {}
+        self._lock = threading.Lock()
+
+        # Cities sorted by cell, those of cell i at _by_cell[_starts[i]:_starts[i + 1]]
+        cells, _ = self._cells(self.latitudes, self.longitudes)
+        self._by_cell = np.argsort(cells, kind="stable")
+        self._starts = np.searchsorted(
+            cells[self._by_cell], np.arange(self.shape[0] * self.shape[1] + 1)
+        )
+
+    def nearest(self, latitude, longitude, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Geocodes of the `k` nearest cities to each point and their distances
+        in km, shaped (points, k), or (k,) for a single point
+        """
+        if not 1 <= k <= len(self.geocodes):
+            raise ValueError(f"`k` deve estar entre 1 e {len(self.geocodes)}")
+
+        latitude, longitude, scalar = _points(latitude, longitude)
+        positions = np.empty((len(latitude), k), dtype="int64")
+
+        cells, inside = self._cells(latitude, longitude)
+        queries = unit_vectors(latitude, longitude)
+        candidates = self.candidates(k)
+
+        for chunk in _chunks(np.flatnonzero(inside), 16384):
+            options = candidates[cells[chunk]]
+            dots = np.einsum("nd,nmd->nm", queries[chunk], self.points[options])
+            dots[options < 0] = -2
+            positions[chunk] = np.take_along_axis(options, _top(dots, k), axis=1)
+
+        for chunk in _chunks(np.flatnonzero(~inside), 1024):
+            positions[chunk] = _top(queries[chunk] @ self.points.T, k)
+
+        distances = haversine(
+            latitude[:, None],
+            longitude[:, None],
+            self.latitudes[positions],
+            self.longitudes[positions],
+        )
+        order = np.argsort(distances, axis=1, kind="stable")
+        geocodes = np.take_along_axis(self.geocodes[positions], order, axis=1)
+        distances = np.take_along_axis(distances, order, axis=1)
+
+        if scalar:
+            return geocodes[0], distances[0]
+        return geocodes, distances
+
+    def within(self, latitude, longitude, raio: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Geocodes of the cities within `raio` km of a point and their
+        distances, nearest first. Arrays of points get a list of pairs.
+        """
+        latitude, longitude, scalar = _points(latitude, longitude)
+        radians = np.radians(self.latitudes), np.radians(self.longitudes)
+        cosines = np.cos(radians[0])
+
+        found: List[Tuple[np.ndarray, np.ndarray]] = []
+        for points in _chunks(np.arange(len(latitude)), 65536):
+            begins, ends = self._segments(latitude[points], longitude[points], raio)
+            sizes = (ends - begins).sum(axis=1)
+            for chunk in _budget(sizes, 1 << 22):
+                # Every (point, city) pair in the cells around each point
+                starts, lengths = begins[chunk].ravel(), (ends - begins)[chunk].ravel()
+                owners = np.repeat(np.arange(len(chunk)), sizes[chunk])
+                offsets = np.cumsum(lengths) - lengths
+                cities = self._by_cell[
+                    np.arange(lengths.sum()) + np.repeat(starts - offsets, lengths)
+                ]
+
+                lat = np.radians(latitude[points[chunk]])[owners]
+                lon = np.radians(longitude[points[chunk]])[owners]
+                distances = _haversine(
+                    lat,
+                    lon,
+                    np.cos(lat),
+                    radians[0][cities],
+                    radians[1][cities],
+                    cosines[cities],
+                )
+                keep = distances <= raio
+                owners, cities, distances = owners[keep], cities[keep], distances[keep]
+
+                order = np.lexsort((cities, distances, owners))
+                bounds = np.cumsum(np.bincount(owners, minlength=len(chunk)))[:-1]
+                found.extend(
+                    zip(
+                        np.split(self.geocodes[cities[order]], bounds),
+                        np.split(distances[order], bounds),
+                    )
+                )
+
+        return found[0] if scalar else found
+
+    def positions(self, geocodes) -> np.ndarray:
+        """Positions of `geocodes` in the index arrays"""
+        geocodes = np.asarray(geocodes, dtype="int64").ravel()
+        sorted_geocodes = self.geocodes[self._sorted]
+        found = np.searchsorted(sorted_geocodes, geocodes).clip(
+            0, len(self._sorted) - 1
+        )
+        unknown = sorted_geocodes[found] != geocodes
+        if unknown.any():
+            raise ValueError(
+                f"Municípios não encontrados: {geocodes[unknown][:10].tolist()}"
+            )
+        return self._sorted[found]
+
+    def distances(
+        self,
+        origins: np.ndarray,
+        destinations: np.ndarray,
+        dtype: str = "float64",
+        path: Optional[str] = None,
+        chunk: int = 512,
+    ) -> np.ndarray:
+        """
+        Haversine distances in km between the cities at positions `origins`
+        (rows) and `destinations` (columns), computed `chunk` rows at a time.
+        With `path` the matrix is written to a .npy file, memory-mapped.
+        """
+        shape = (len(origins), len(destinations))
+        if path is None:
+            matrix = np.empty(shape, dtype=dtype)
+        else:
+            matrix = np.lib.format.open_memmap(
+                path, mode="w+", dtype=dtype, shape=shape
+            )
+
+        latitudes = np.radians(self.latitudes)
+        longitudes = np.radians(self.longitudes)
+        cosines = np.cos(latitudes)
+        lat2, lon2, cos2 = (
+            values[destinations][None, :] for values in (latitudes, longitudes, cosines)
+        )
+
+        for start in range(0, shape[0], chunk):
+            rows = origins[start : start + chunk]
+            lat1, lon1, cos1 = (
+                values[rows][:, None] for values in (latitudes, longitudes, cosines)
+            )
+            matrix[start : start + chunk] = _haversine(
+                lat1, lon1, cos1, lat2, lon2, cos2
+            )
+
+        if path is not None:
+            matrix.flush()
+        return matrix
+
+    def candidates(self, k: int) -> np.ndarray:
+        """Candidate cities of every cell for k-nearest queries, padded with -1"""
+        if k not in self._candidates:
+            with self._lock:
+                if k not in self._candidates:
+                    self._candidates[k] = self._build_candidates(k)
+        return self._candidates[k]
+
+    def _build_candidates(self, k: int) -> np.ndarray:
+        rows, columns = np.indices(self.shape).reshape(2, -1)
+        latitude = self.origin[0] + (rows + 0.5) * self.cell
+        longitude = self.origin[1] + (columns + 0.5) * self.cell
+        # Farthest corner sits on the side closest to the equator
+        equator = latitude - np.sign(latitude) * self.cell / 2
+        diagonal = haversine(latitude, longitude, equator, longitude + self.cell / 2)
+
+        centers = unit_vectors(latitude, longitude)
+        lists = []
+        for chunk in _chunks(np.arange(len(latitude)), 1024):
+            dots = centers[chunk] @ self.points.T
+            if k == 1:
+                kth = dots.max(axis=1)
+            else:
+                kth = -np.partition(-dots, k - 1, axis=1)[:, k - 1]
+            angle = np.arccos(np.clip(kth, -1, 1)) + 2 * diagonal[chunk] / (
+                EARTH_RADIUS_KM
+            )
+            limit = np.cos(np.minimum(angle, np.pi)) - 1e-9
+            lists.extend(
+                np.flatnonzero(row >= bound) for row, bound in zip(dots, limit)
+            )
+
+        candidates = np.full((len(lists), max(map(len, lists))), -1, dtype="int32")
+        for cell, members in enumerate(lists):
+            candidates[cell, : len(members)] = members
+        return candidates
+
+    def _segments(
+        self, latitude: np.ndarray, longitude: np.ndarray, raio: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ranges of `_by_cell` holding the cities that may be within `raio` km
+        of each point, one per grid row, shaped (points, rows): the cells of
+        the row between the point's longitude bounds
+        """
+        angle = min(raio / EARTH_RADIUS_KM, np.pi)
+        margin = 1e-6
+        degrees = np.degrees(angle) + margin
+
+        # Widest longitude difference on the circle around each point, unless
+        # it reaches a pole or crosses the antimeridian
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.sin(angle) / np.cos(np.radians(latitude))
+            spread = np.degrees(np.arcsin(np.clip(ratio, 0, 1))) + margin
+        every = (angle >= np.pi / 2 - np.abs(np.radians(latitude))) | ~(ratio < 1)
+        every |= (longitude - spread < -180) | (longitude + spread > 180)
+
+        rows, columns = self.shape
+        first = np.floor((latitude - degrees - self.origin[0]) / self.cell)
+        last = np.floor((latitude + degrees - self.origin[0]) / self.cell)
+        west = np.floor((longitude - spread - self.origin[1]) / self.cell)
+        east = np.floor((longitude + spread - self.origin[1]) / self.cell)
+        west = np.where(every, 0, np.clip(west, 0, None))
+        east = np.where(every, columns - 1, np.clip(east, None, columns - 1))
+        first, last = np.clip(first, 0, None), np.clip(last, None, rows - 1)
+
+        empty = ~np.isfinite(latitude + longitude) | (west > east) | (first > last)
+        count = int((last - first)[~empty].max(initial=-1)) + 1
+        row = np.where(empty, 0, first)[:, None] + np.arange(count)
+        empty = empty[:, None] | (row > last[:, None])
+        row = np.where(empty, 0, row).astype("int64")
+
+        west = np.where(empty, 0, row * columns + west[:, None]).astype("int64")
+        east = np.where(empty, 0, row * columns + east[:, None]).astype("int64")
+        begins = self._starts[west]
+        ends = np.where(empty, begins, self._starts[east + 1])
+        return begins, ends
+
+    def _cells(
+        self, latitude: np.ndarray, longitude: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        rows = np.floor((latitude - self.origin[0]) / self.cell)
+        columns = np.floor((longitude - self.origin[1]) / self.cell)
+        inside = (
+            (rows >= 0)
+            & (rows < self.shape[0])
+            & (columns >= 0)
+            & (columns < self.shape[1])
+        )
+        cells = np.where(inside, rows * self.shape[1] + columns, 0)
+        return cells.astype("int64"), inside
+
+
+def _points(latitude, longitude) -> Tuple[np.ndarray, np.ndarray, bool]:
+    scalar = np.ndim(latitude) == 0 and np.ndim(longitude) == 0
+    latitude = np.atleast_1d(np.asarray(latitude, dtype="float64"))
+    longitude = np.atleast_1d(np.asarray(longitude, dtype="float64"))
+    if latitude.shape != longitude.shape:
+        raise ValueError("`latitude` e `longitude` devem ter o mesmo tamanho")
+    return latitude, longitude, scalar
+
+
+def _chunks(positions: np.ndarray, size: int):
+    for start in range(0, len(positions), size):
+        yield positions[start : start + size]
+
+
+def _budget(sizes: np.ndarray, budget: int):
+    """Consecutive slices of positions whose `sizes` add up to about `budget`"""
+    totals = np.cumsum(sizes)
+    start = 0
+    while start < len(sizes):
+        base = totals[start - 1] if start else 0
+        end = max(int(np.searchsorted(totals, base + budget, "right")), start + 1)
+        yield np.arange(start, end)
+        start = end
+
+
+def _top(dots: np.ndarray, k: int) -> np.ndarray:
+    """Columns of the k largest values of each row"""
+    if k == 1:
+        return dots.argmax(axis=1)[:, None]
+    return np.argpartition(-dots, k - 1, axis=1)[:, :k]
+
+
+_spatial_index = index.derived(lambda: SpatialIndex(*_coordinates()))
+load = _spatial_index.load
+reset = _spatial_index.reset
+
+
+def nearest(latitude, longitude, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Geocodes of the `k` municipality seats nearest to each point (haversine
+    distance) and their distances in km. Takes a single point or NumPy
+    arrays of points, returning arrays shaped (k,) or (points, k)
+    """
+    return load().nearest(latitude, longitude, k=k)
+
+
+def within(latitude, longitude, raio: float):
+    """
+    Geocodes of the municipality seats within `raio` km of a point and their
+    distances, nearest first; a list of such pairs for arrays of points
+    """
+    return load().within(latitude, longitude, raio)
+
+
+def distance_matrix(
+    origens=None,
+    destinos=None,
+    dtype: str = "float64",
+    path: Optional[str] = None,
+    chunk: int = 512,
+) -> DistanceMatrix:
+    """
+    Haversine distances in km between two sets of municipalities: geocodes,
+    `Municipio` objects or a territorial unit (all its cities, e.g.
+    `Estado(uf="RJ")`). `None` means every city and `destinos` defaults to
+    `origens`. The matrix is computed `chunk` rows at a time, as `dtype`
+    (e.g. "float32" to halve its size), and written to the .npy file at
+    `path` when given, returning it memory-mapped.
+    """
+    territory = load()
+    origins = _geocodes(origens, territory)
+    destinations = origins if destinos is None else _geocodes(destinos, territory)
+
+    matrix = territory.distances(
+        territory.positions(origins),
+        territory.positions(destinations),
+        dtype=dtype,
+        path=path,
+        chunk=chunk,
+    )
+    return DistanceMatrix(origins, destinations, matrix)
+
+
+def neighbors(geocodigos, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The `k` nearest municipalities of each of `geocodigos` (excluding the
+    city itself) and their distances in km, shaped (cities, k)
+    """
+    territory = load()
+    geocodes = _geocodes(geocodigos, territory)
+    positions = territory.positions(geocodes)
+
+    found, distances = territory.nearest(
+        territory.latitudes[positions], territory.longitudes[positions], k=k + 1
+    )
+    others = found != geocodes[:, None]
+    # Keeps the first k entries that aren't the city itself
+    keep = others & (np.cumsum(others, axis=1) <= k)
+    return found[keep].reshape(-1, k), distances[keep].reshape(-1, k)
+
+
+def nearest_city(latitude: float, longitude: float):
+    """`Municipio` whose seat is the nearest to the point"""
+    from ibge.brasil import Municipio
+
+    geocodes, _ = nearest(latitude, longitude)
+    return Municipio(int(geocodes[0]))
+
+
+def _coordinates() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    territory = index.get()
+    if territory is not None:
+        rows = list(territory.cities.values())
+        return (
+            np.array([row[0] for row in rows]),
+            np.array([row[3] for row in rows]),
+            np.array([row[4] for row in rows]),
+        )
+
+    columns = execute("city_coordinates").fetchnumpy()
+    return columns["id"], columns["latitude"], columns["longitude"]
+
+
+def _geocodes(
+    selection: Union[None, object, Iterable], territory: SpatialIndex
+) -> np.ndarray:
+    if selection is None:
+        return territory.geocodes
+    if hasattr(selection, "raw"):
+        return np.asarray(selection.raw.municipios, dtype="int32")
+    if hasattr(selection, "geocodigo"):
+        return np.array([selection.geocodigo], dtype="int32")
+    return np.array(
+        [getattr(item, "geocodigo", item) for item in selection], dtype="int64"
+    ).astype("int32")
@@ -0,0 +1,152 @@
+from typing import Dict
+
+try:
+    import numpy as np
+except ImportError as error:  # pragma: no cover
+    raise ImportError(
+        "As funções de geocódigos requerem numpy: pip install ibge-utils[geo]"
+    ) from error
+
+from ibge.sql import execute
+from ibge.brasil import index
+
+
+# Weights of the six leading digits in the check digit, from the last one
+WEIGHTS = (2, 1, 2, 1, 2, 1)
+
+
+def check_digits(prefixes) -> np.ndarray:
+    """
+    IBGE check digit of 6-digit city codes: each digit times its weight (1
+    and 2, alternating from the first), adding the digits of each product;
+    the check digit takes the sum to the next multiple of 10
+    """
+    prefixes = np.asarray(prefixes, dtype="int64")
+    total = np.zeros(prefixes.shape, dtype="int64")
+    for position, weight in enumerate(WEIGHTS):
+        product = prefixes // 10**position % 10 * weight
+        total += product // 10 + product % 10
+    return ((10 - total % 10) % 10).astype("int8")
+
+
+class GeocodeTable:
+    """
+    Lookups indexed by code: every valid 7-digit geocode, the city of each
+    6-digit prefix and the UF of each state code
+    """
+
+    def __init__(self, cities: np.ndarray, states: Dict[int, str]):
+        self.ufs = np.full(100, "", dtype="<U2")
+        for state, uf in states.items():
+            self.ufs[state] = uf
+        self.states = self.ufs != ""
+
+        # State of each code // 10_000: 3 digits for 7-digit codes, 2 for 6
+        leading = np.arange(1000)
+        states = np.where(leading >= 100, leading // 10, leading)
+        self.states_by_leading = np.where(self.states[states], states, 0).astype(
+            "int32"
+        )
+
+        self.cities = np.zeros(1_000_000, dtype="int32")
+        self.cities[cities // 10] = cities
+
+        # Official codes that don't follow the check digit are valid too
+        prefixes = np.arange(100_000, 1_000_000)
+        prefixes = prefixes[self.states[prefixes // 10_000]]
+        self.geocodes = np.zeros(10_000_000, dtype=bool)
+        self.geocodes[prefixes * 10 + check_digits(prefixes)] = True
+        self.geocodes[cities] = True
+
+    def valid(self, codes: np.ndarray) -> np.ndarray:
+        return self.geocodes[_bounded(codes)]
+
+    def expand(self, codes: np.ndarray) -> np.ndarray:
+        codes = _bounded(codes)
+        seven = codes >= 1_000_000
+        expanded = self.cities[np.where(seven, codes // 10, codes)]
+        return np.where(seven & (expanded != codes), 0, expanded)
+
+    def state(self, codes: np.ndarray) -> np.ndarray:
+        return self.states_by_leading[_bounded(codes) // 10_000]
+
+
+_table = index.derived(lambda: GeocodeTable(*_reference()))
+load = _table.load
+reset = _table.reset
+
+
+def valid(geocodigos) -> np.ndarray:
+    """
+    Whether each geocode is a well-formed 7-digit city code: a known state
+    prefix and a correct check digit (or a known city, the few official
+    codes that don't follow it). Accepts numbers or strings, in any
+    array-like (NumPy, pandas, pyarrow)
+    """
+    return load().valid(_codes(geocodigos))
+
+
+def expand(geocodigos) -> np.ndarray:
+    """
+    7-digit geocodes of the cities given by 6-digit codes (as in DATASUS
+    data), or by 7-digit ones; 0 where no city has the code
+    """
+    return load().expand(_codes(geocodigos))
+
+
+def truncate(geocodigos) -> np.ndarray:
+    """6-digit codes of 7-digit geocodes (6-digit ones are kept), 0 otherwise"""
+    codes = _bounded(_codes(geocodigos))
+    truncated = np.where(codes >= 1_000_000, codes // 10, codes)
+    return np.where(truncated >= 100_000, truncated, 0)
+
+
+def state(geocodigos) -> np.ndarray:
+    """Geocode of the state of 6 or 7-digit city codes, 0 if unknown"""
+    return load().state(_codes(geocodigos))
+
+
+def uf(geocodigos) -> np.ndarray:
+    """UF of the state of 6 or 7-digit city codes, "" if unknown"""
+    table = load()
+    return table.ufs[table.state(_codes(geocodigos))]
+
+
+def _codes(geocodigos) -> np.ndarray:
+    """Integer codes, -1 where they aren't whole numbers"""
+    if hasattr(geocodigos, "to_numpy"):
+        try:
+            values = geocodigos.to_numpy(zero_copy_only=False)  # pyarrow
+        except TypeError:
+            values = geocodigos.to_numpy()
+    else:
+        values = np.asarray(geocodigos)
+
+    if values.dtype.kind in "iu":
+        return values
+    if values.dtype.kind == "f":
+        whole = np.isfinite(values) & (values == np.round(values))
+        return np.where(whole, values, -1).astype("int64")
+
+    text = np.char.strip(values.astype(str))
+    numeric = np.char.isdigit(text) & (np.char.str_len(text) <= 18)
+    codes = np.full(text.shape, -1, dtype="int64")
+    codes[numeric] = text[numeric].astype("int64")
+    return codes
+
+
+def _bounded(codes: np.ndarray) -> np.ndarray:
+    """Codes as int32, 0 for those outside 0-9999999 (invalid either way)"""
+    return np.where((codes > 0) & (codes < 10_000_000), codes, 0).astype(
+        "int32", copy=False
+    )
+
+
+def _reference():
+    territory = index.get()
+    if territory is not None:
+        states = {id: row[2] for id, row in territory.states.items()}
+        return np.fromiter(territory.cities, dtype="int32"), states
+
+    cities = execute("city_geocodes").fetchnumpy()["id"]
+    return cities.astype("int32"), dict(execute("state_ufs").fetchall())
@@ -0,0 +1,260 @@
+import os
+import threading
+from typing import (
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from ibge import sql
+from ibge.sql.queries import (
+    STATE_COLUMNS,
+    MESOREGION_COLUMNS,
+    MICROREGION_COLUMNS,
+    CITY_COLUMNS,
+)
+from ibge.brasil import cache
+
+
+# Rows of each territorial table, in the column order of the index
+TABLE_QUERIES: Dict[str, str] = {
+    "macroregions": "SELECT id, name FROM macroregions",
+    "states": f"SELECT {STATE_COLUMNS} FROM states",
+    "mesoregions": f"SELECT {MESOREGION_COLUMNS} FROM mesoregions",
+    "microregions": f"SELECT {MICROREGION_COLUMNS} FROM microregions",
+    "cities": f"SELECT {CITY_COLUMNS} FROM cities",
+}
+
+
+class TerritorialIndex:
+    """
+    The whole DTB hierarchy held in memory. Rows keep the column order of the
+    `*_COLUMNS` constants and every list keeps the table order of ibge.duckdb.
+    """
+
+    macroregions: Dict[int, str]
+    states: Dict[int, Tuple]
+    states_by_uf: Dict[str, int]
+    states_by_macroregion: Dict[int, List[int]]
+    mesoregions: Dict[str, Tuple]
+    mesoregions_by_state: Dict[int, List[str]]
+    mesoregions_by_macroregion: Dict[int, List[str]]
+    microregions: Dict[int, Tuple]
+    microregions_by_name: Dict[str, List[int]]
+    microregions_by_mesoregion: Dict[str, List[int]]
+    microregions_by_macroregion: Dict[int, List[int]]
+    cities: Dict[int, Tuple]
+    cities_by_microregion: Dict[int, List[int]]
+    cities_by_macroregion: Dict[int, List[int]]
+
+    def __init__(self, db):
+        self._build(
+            **{
+                table: db.sql(query).fetchall()
+                for table, query in TABLE_QUERIES.items()
+            }
+        )
+
+    @classmethod
+    def from_rows(cls, **tables: Iterable[Tuple]) -> "TerritorialIndex":
+        """Index of the rows of each table in `TABLE_QUERIES`, in table order"""
+        index = cls.__new__(cls)
+        index._build(**tables)
+        return index
+
+    def _build(
+        self,
+        macroregions: Iterable[Tuple],
+        states: Iterable[Tuple],
+        mesoregions: Iterable[Tuple],
+        microregions: Iterable[Tuple],
+        cities: Iterable[Tuple],
+    ) -> None:
+        self.macroregions = dict(macroregions)
+
+        self.states = {}
+        self.states_by_uf = {}
+        self.states_by_macroregion = {id: [] for id in self.macroregions}
+        for row in states:
+            self.states[row[0]] = row
+            self.states_by_uf[row[2].upper()] = row[0]
+            self.states_by_macroregion.setdefault(row[3], []).append(row[0])
+
+        self.mesoregions = {}
+        self.mesoregions_by_state = {id: [] for id in self.states}
+        self.mesoregions_by_macroregion = {id: [] for id in self.macroregions}
+        mesoregion_macroregion = {}
+        for row in mesoregions:
+            self.mesoregions.setdefault(row[0].lower(), row)
+            self.mesoregions_by_state.setdefault(row[1], []).append(row[0])
+            macroregion = self.states[row[1]][3]
+            mesoregion_macroregion[row[0]] = macroregion
+            self.mesoregions_by_macroregion[macroregion].append(row[0])
+
+        self.microregions = {}
+        self.microregions_by_name = {}
+        self.microregions_by_mesoregion = {name: [] for name in mesoregion_macroregion}
+        self.microregions_by_macroregion = {id: [] for id in self.macroregions}
+        microregion_macroregion = {}
+        for row in microregions:
+            self.microregions[row[0]] = row
+            self.microregions_by_name.setdefault(row[1].lower(), []).append(row[0])
+            self.microregions_by_mesoregion.setdefault(row[2], []).append(row[0])
+            macroregion = mesoregion_macroregion[row[2]]
+            microregion_macroregion[row[0]] = macroregion
+            self.microregions_by_macroregion[macroregion].append(row[0])
+
+        self.cities = {}
+        self.cities_by_microregion = {id: [] for id in self.microregions}
+        self.cities_by_macroregion = {id: [] for id in self.macroregions}
+        for row in cities:
+            self.cities[row[0]] = row
+            self.cities_by_microregion.setdefault(row[2], []).append(row[0])
+            macroregion = microregion_macroregion[row[2]]
+            self.cities_by_macroregion[macroregion].append(row[0])
+
+    def state(
+        self, geocodigo: Optional[Union[int, str]] = None, uf: Optional[str] = None
+    ) -> Optional[Tuple]:
+        if geocodigo:
+            return self.states.get(int(geocodigo))
+        if uf:
+            return self.states.get(self.states_by_uf.get(uf.upper()))
+        return None
+
+    def mesoregion(self, nome: str) -> Optional[Tuple]:
+        return self.mesoregions.get(nome.lower())
+
+    def microregion(self, id: int) -> Optional[Tuple]:
+        return self.microregions.get(int(id))
+
+    def microregions_named(
+        self, nome: str, mesorregiao: Optional[str] = None
+    ) -> List[Tuple]:
+        rows = [
+            self.microregions[id]
+            for id in self.microregions_by_name.get(nome.lower(), [])
+        ]
+        if mesorregiao:
+            rows = [row for row in rows if row[2].lower() == mesorregiao.lower()]
+        return rows
+
+    def city(self, geocodigo: Union[int, str]) -> Optional[Tuple]:
+        return self.cities.get(int(geocodigo))
+
+
+_index: Optional[TerritorialIndex] = None
+_lock = threading.Lock()
+_reload_hooks: List[Callable[[], None]] = []
+
+
+def load(snapshot: Optional[str] = None) -> TerritorialIndex:
+    """
+    Loads all territorial tables into memory (once); from then on every
+    lookup in `ibge.brasil` is resolved without querying DuckDB. With
+    `snapshot`, the tables are mapped from a file written by
+    `ibge.brasil.snapshot.export()` instead of read from ibge.duckdb,
+    replacing an index already loaded from elsewhere (as `reload()` does).
+    """
+    global _index
+    if _index is None or not _loaded_from(snapshot):
+        with _lock:
+            if _index is None:
+                _index = _open(snapshot)
+            elif not _loaded_from(snapshot):
+                _replace(snapshot)
+    return _index
+
+
+def reload() -> TerritorialIndex:
+    """
+    Reopens ibge.duckdb (or the snapshot) and rebuilds the index, e.g. after
+    the file changed
+    """
+    with _lock:
+        snapshot = getattr(_index, "path", None)
+        if snapshot is None:
+            sql.close()
+        _replace(snapshot)
+    return _index
+
+
+def _loaded_from(snapshot: Optional[str]) -> bool:
+    """Whether the loaded index satisfies `load(snapshot)`"""
+    if snapshot is None:
+        return True
+    path = getattr(_index, "path", None)
+    return path is not None and os.path.realpath(path) == os.path.realpath(snapshot)
+
+
+def _replace(snapshot: Optional[str]) -> None:
+    global _index
+    _index = _open(snapshot)
+    cache.clear_cache()
+    for hook in _reload_hooks:
+        hook()
+
+
+def on_reload(hook: Callable[[], None]) -> None:
+    """Registers `hook` to drop data derived from the index when it's reloaded"""
+    _reload_hooks.append(hook)
+
+
+T = TypeVar("T")
+
+
+class Derived(Generic[T]):
+    """
+    Data built by `builder` from the territorial tables (once, from the
+    in-memory index if loaded), dropped when the index is reloaded
+    """
+
+    def __init__(self, builder: Callable[[], T]):
+        self.builder = builder
+        self._value: Optional[T] = None
+        self._lock = threading.Lock()
+        on_reload(self.reset)
+
+    def load(self) -> T:
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self.builder()
+        return self._value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._value = None
+
+
+def derived(builder: Callable[[], T]) -> Derived[T]:
+    """Lazily built `builder()`, e.g. `load = derived(build).load`"""
+    return Derived(builder)
+
+
+def _open(snapshot: Optional[str]) -> TerritorialIndex:
+    if snapshot is not None:
+        from ibge.brasil.snapshot import SnapshotIndex
+
+        return SnapshotIndex(snapshot)
+    return TerritorialIndex(sql.cursor())
+
+
+def unload() -> None:
+    global _index
+    with _lock:
+        _index = None
+
+
+def get() -> Optional[TerritorialIndex]:
+    return _index
+
+
+def is_loaded() -> bool:
+    return _index is not None
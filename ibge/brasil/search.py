@@ -0,0 +1,209 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Hashable, List, NamedTuple, Optional, Set, Tuple
+
+from ibge.sql import execute
+from ibge.brasil import index
+
+
+LEVELS = ["macrorregiao", "estado", "mesorregiao", "microrregiao", "municipio"]
+
+
+class Resultado(NamedTuple):
+    nivel: str
+    chave: Hashable
+    nome: str
+    uf: Optional[str]
+    pontuacao: float
+
+    def unidade(self) -> object:
+        """Instantiates the territorial unit found"""
+        import ibge.brasil as brasil
+
+        if self.nivel == "macrorregiao":
+            return brasil.Macrorregiao(geocodigo=self.chave)
+        if self.nivel == "estado":
+            return brasil.Estado(geocodigo=self.chave)
+        if self.nivel == "mesorregiao":
+            return brasil.Mesorregiao(self.chave)
+        if self.nivel == "microrregiao":
+            return brasil.Microrregiao(__id__=self.chave)
+        return brasil.Municipio(self.chave)
+
+
+def fold(text: str) -> str:
+    """Lowercase `text` without accents, punctuation or repeated spaces"""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.split(r"[^0-9a-z]+", text.lower())).strip()
+
+
+def trigrams(folded: str) -> Set[str]:
+    padded = f"  {folded} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    Accent-folded names of every territorial unit, searchable by exact
+    name, name prefix, word prefixes (in any order) and trigram similarity
+    """
+
+    entries: List[Tuple[str, Hashable, str, Optional[str]]]
+    folded: List[str]
+
+    def __init__(self, entries: List[Tuple[str, Hashable, str, Optional[str]]]):
+        self.entries = entries
+        self.folded = [fold(name) for _, _, name, _ in entries]
+
+        names = sorted((name, i) for i, name in enumerate(self.folded))
+        self.names = [name for name, _ in names]
+        self.names_ids = [i for _, i in names]
+
+        tokens = sorted(
+            (token, i)
+            for i, name in enumerate(self.folded)
+            for token in set(name.split())
+        )
+        self.tokens = [token for token, _ in tokens]
+        self.tokens_ids = [i for _, i in tokens]
+
+        self.trigrams: Dict[str, List[int]] = {}
+        self.trigram_counts = []
+        for i, name in enumerate(self.folded):
+            grams = trigrams(name)
+            self.trigram_counts.append(len(grams))
+            for gram in grams:
+                self.trigrams.setdefault(gram, []).append(i)
+
+    def search(
+        self,
+        texto: str,
+        nivel: Optional[str] = None,
+        uf: Optional[str] = None,
+        limite: int = 10,
+        minimo: float = 0.3,
+    ) -> List[Resultado]:
+        query = fold(texto)
+        if not query:
+            return []
+
+        uf = uf.upper() if uf else None
+        scores: Dict[int, float] = {}
+
+        def accept(i: int) -> bool:
+            level, _, _, entry_uf = self.entries[i]
+            return (nivel is None or level == nivel) and (uf is None or entry_uf == uf)
+
+        for i in self._prefixed(self.names, self.names_ids, query):
+            if accept(i):
+                coverage = len(query) / len(self.folded[i])
+                scores[i] = 1.0 if coverage == 1 else 0.9 + 0.09 * coverage
+
+        words = query.split()
+        matches = None
+        for word in words:
+            found = set(self._prefixed(self.tokens, self.tokens_ids, word))
+            matches = found if matches is None else matches & found
+        for i in matches or ():
+            if i not in scores and accept(i):
+                scores[i] = 0.6 + 0.29 * len(query) / len(self.folded[i])
+
+        if len(scores) < limite:
+            grams = trigrams(query)
+            shared = Counter()
+            for gram in grams:
+                shared.update(self.trigrams.get(gram, ()))
+            for i, common in shared.items():
+                if i in scores:
+                    continue
+                similarity = 2 * common / (len(grams) + self.trigram_counts[i])
+                if similarity >= minimo and accept(i):
+                    scores[i] = 0.6 * similarity
+
+        ranked = sorted(
+            scores.items(),
+            key=lambda item: (-item[1], len(self.folded[item[0]]), item[0]),
+        )
+        return [
+            Resultado(*self.entries[i], round(score, 4)) for i, score in ranked[:limite]
+        ]
+
+    def exact(self, nome: str, nivel: str) -> List[Resultado]:
+        """Units of `nivel` whose name is `nome` once accents are folded"""
+        query = fold(nome)
+        return [
+            Resultado(*self.entries[i], 1.0)
+            for i in self._prefixed(self.names, self.names_ids, query)
+            if self.folded[i] == query and self.entries[i][0] == nivel
+        ]
+
+    @staticmethod
+    def _prefixed(keys: List[str], ids: List[int], prefix: str) -> List[int]:
+        found = []
+        for position in range(bisect_left(keys, prefix), len(keys)):
+            if not keys[position].startswith(prefix):
+                break
+            found.append(ids[position])
+        return found
+
+
+_search_index = index.derived(lambda: SearchIndex(_entries()))
+load = _search_index.load
+reset = _search_index.reset
+
+
+def buscar(
+    texto: str,
+    nivel: Optional[str] = None,
+    uf: Optional[str] = None,
+    limite: int = 10,
+) -> List[Resultado]:
+    """
+    Territorial units whose name matches `texto`, ignoring accents and case,
+    best matches first. `nivel` restricts the search to one level
+    (macrorregiao, estado, mesorregiao, microrregiao or municipio) and `uf`
+    to one state. Ex: `buscar("sao joao del rei", nivel="municipio", uf="MG")`
+    """
+    if nivel is not None and nivel not in LEVELS:
+        raise ValueError(f"Nível `{nivel}` inválido. Opções: {LEVELS}")
+    return load().search(texto, nivel=nivel, uf=uf, limite=limite)
+
+
+def _entries() -> List[Tuple[str, Hashable, str, Optional[str]]]:
+    territory = index.get()
+    if territory is None:
+        return [
+            (level, name if level == "mesorregiao" else id, name, uf)
+            for level, id, name, uf in execute("search_names").fetchall()
+        ]
+
+    def state_uf(state: int) -> str:
+        return territory.states[state][2]
+
+    entries = [
+        ("macrorregiao", id, name, None) for id, name in territory.macroregions.items()
+    ]
+    entries += [
+        ("estado", id, name, uf) for id, name, uf, _ in territory.states.values()
+    ]
+    entries += [
+        ("mesorregiao", row[0], row[0], state_uf(row[1]))
+        for row in territory.mesoregions.values()
+    ]
+    entries += [
+        (
+            "microrregiao",
+            row[0],
+            row[1],
+            state_uf(territory.mesoregions[row[2].lower()][1]),
+        )
+        for row in territory.microregions.values()
+    ]
+    for row in territory.cities.values():
+        mesoregion = territory.microregions[row[2]][2]
+        state = territory.mesoregions[mesoregion.lower()][1]
+        entries.append(("municipio", row[0], row[1], state_uf(state)))
+    return entries
@@ -0,0 +1,259 @@
+import json
+import mmap
+import os
+import struct
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from ibge.brasil.index import TABLE_QUERIES, TerritorialIndex
+
+# File layout: MAGIC, the header length (uint32) and a JSON header describing
+# every section, then the sections themselves, 8-byte aligned:
+#   - each table's records, fixed-width and in table order, with text columns
+#     stored as (offset, length) into the string heap;
+#   - per key column, the record positions sorted by key (text keys compared
+#     lowercased) and, for integer keys, the sorted keys themselves;
+#   - the string heap, UTF-8.
+# Everything is little-endian.
+MAGIC = b"IBGESNAP"
+VERSION = 1
+
+# Column types per table: "i" int32, "d" float64, "s" text
+COLUMNS: Dict[str, str] = {
+    "macroregions": "is",
+    "states": "issi",
+    "mesoregions": "sii",
+    "microregions": "issi",
+    "cities": "isidds",
+}
+
+# Columns each table is binary searched by
+KEYS: Dict[str, Tuple[int, ...]] = {
+    "macroregions": (0,),
+    "states": (0, 2),
+    "mesoregions": (0,),
+    "microregions": (0, 1),
+    "cities": (0,),
+}
+
+FORMATS = {"i": "i", "d": "d", "s": "II"}
+
+
+def export(path: str, database: Optional[str] = None) -> None:
+    """
+    Writes the territorial tables of `database` (ibge.duckdb by default) to
+    a snapshot file at `path`, loadable with `index.load(snapshot=path)`
+    """
+    from ibge import sql
+
+    with sql.ConnectionPool(database or sql.IBGE_DB) as pool:
+        db = pool.cursor()
+        tables = {
+            table: db.sql(query).fetchall() for table, query in TABLE_QUERIES.items()
+        }
+
+    strings: Dict[str, Tuple[int, int]] = {}
+    heap = bytearray()
+
+    def text(value: str) -> Tuple[int, int]:
+        if value not in strings:
+            encoded = value.encode("utf-8")
+            strings[value] = (len(heap), len(encoded))
+            heap.extend(encoded)
+        return strings[value]
+
+    sections: List[bytes] = []
+    offset = 0
+
+    def add(data: bytes) -> int:
+        nonlocal offset
+        start = offset
+        padding = -len(data) % 8
+        sections.append(data + bytes(padding))
+        offset += len(data) + padding
+        return start
+
+    header = {"version": VERSION, "tables": {}}
+    for table, rows in tables.items():
+        columns = COLUMNS[table]
+        record = struct.Struct(_format(columns))
+        records = bytearray()
+        for row in rows:
+            values = []
+            for kind, value in zip(columns, row):
+                values.extend(text(value) if kind == "s" else (value,))
+            records += record.pack(*values)
+
+        keys = {}
+        for column in KEYS[table]:
+            if columns[column] == "s":
+                order = sorted(range(len(rows)), key=lambda i: rows[i][column].lower())
+                keys[column] = {"positions": add(array("I", order).tobytes())}
+            else:
+                order = sorted(range(len(rows)), key=lambda i: rows[i][column])
+                keys[column] = {
+                    "positions": add(array("I", order).tobytes()),
+                    "keys": add(array("i", (rows[i][column] for i in order)).tobytes()),
+                }
+
+        header["tables"][table] = {
+            "rows": len(rows),
+            "records": add(bytes(records)),
+            "keys": keys,
+        }
+    header["strings"] = add(bytes(heap))
+
+    encoded = json.dumps(header).encode("utf-8")
+    encoded += b" " * (-(len(MAGIC) + 4 + len(encoded)) % 8)
+
+    # Written aside and renamed, so processes mapping `path` never see it half done
+    partial = f"{path}.{os.getpid()}.tmp"
+    with open(partial, "wb") as file:
+        file.write(MAGIC + struct.pack("<I", len(encoded)) + encoded)
+        file.writelines(sections)
+    os.replace(partial, path)
+
+
+class Table:
+    """Fixed-width records of one table in a mapped snapshot"""
+
+    def __init__(
+        self, buffer: memoryview, columns: str, spec: dict, base: int, strings: int
+    ):
+        self.buffer = buffer
+        self.columns = columns
+        self.rows = spec["rows"]
+        self.record = struct.Struct(_format(columns))
+        self.offset = base + spec["records"]
+        self.strings = base + strings
+        self.indexes = {}
+        for column, key in spec["keys"].items():
+            start = base + key["positions"]
+            positions = buffer[start : start + 4 * self.rows].cast("I")
+            values = None
+            if "keys" in key:
+                start = base + key["keys"]
+                values = buffer[start : start + 4 * self.rows].cast("i")
+            self.indexes[int(column)] = (positions, values)
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __iter__(self) -> Iterator[tuple]:
+        end = self.offset + self.record.size * self.rows
+        for values in self.record.iter_unpack(self.buffer[self.offset : end]):
+            yield self._decode(values)
+
+    def row(self, position: int) -> tuple:
+        start = self.offset + self.record.size * position
+        return self._decode(self.record.unpack_from(self.buffer, start))
+
+    def find(self, column: int, value: Union[int, str]) -> List[tuple]:
+        """Rows whose `column` equals `value` (case-insensitively for text)"""
+        positions, values = self.indexes[column]
+        if values is None:
+            value = value.lower()
+
+            def key(position: int) -> str:
+                return self.row(position)[column].lower()
+
+            start = bisect_left(positions, value, key=key)
+            end = bisect_right(positions, value, lo=start, key=key)
+        else:
+            start = bisect_left(values, value)
+            end = bisect_right(values, value, lo=start)
+        return [self.row(position) for position in sorted(positions[start:end])]
+
+    def _decode(self, values: tuple) -> tuple:
+        row = []
+        values = iter(values)
+        for kind in self.columns:
+            if kind == "s":
+                start = self.strings + next(values)
+                row.append(str(self.buffer[start : start + next(values)], "utf-8"))
+            else:
+                row.append(next(values))
+        return tuple(row)
+
+
+class SnapshotIndex:
+    """
+    `TerritorialIndex` over a memory-mapped snapshot file. Single units are
+    found by binary search on the mapped pages, which forked processes share;
+    the collections (`cities_by_microregion`, ...) are indexed in memory on
+    first use.
+    """
+
+    path: str
+    tables: Dict[str, Table]
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with open(self.path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        size = len(MAGIC) + 4
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} não é um snapshot do ibge-utils")
+        (length,) = struct.unpack_from("<I", self._mmap, len(MAGIC))
+        header = json.loads(self._mmap[size : size + length])
+        if header["version"] != VERSION:
+            raise ValueError(
+                f"Versão {header['version']} do snapshot {self.path} não suportada"
+            )
+
+        buffer = memoryview(self._mmap)
+        self.tables = {
+            table: Table(buffer, COLUMNS[table], spec, size + length, header["strings"])
+            for table, spec in header["tables"].items()
+        }
+        self._index: Optional[TerritorialIndex] = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        if name in TerritorialIndex.__annotations__:
+            return getattr(self._load(), name)
+        raise AttributeError(name)
+
+    def state(
+        self, geocodigo: Optional[Union[int, str]] = None, uf: Optional[str] = None
+    ) -> Optional[Tuple]:
+        if geocodigo:
+            return self._first("states", 0, int(geocodigo))
+        if uf:
+            return self._first("states", 2, uf)
+        return None
+
+    def mesoregion(self, nome: str) -> Optional[Tuple]:
+        return self._first("mesoregions", 0, nome)
+
+    def microregion(self, id: int) -> Optional[Tuple]:
+        return self._first("microregions", 0, int(id))
+
+    def microregions_named(
+        self, nome: str, mesorregiao: Optional[str] = None
+    ) -> List[Tuple]:
+        rows = self.tables["microregions"].find(1, nome)
+        if mesorregiao:
+            rows = [row for row in rows if row[2].lower() == mesorregiao.lower()]
+        return rows
+
+    def city(self, geocodigo: Union[int, str]) -> Optional[Tuple]:
+        return self._first("cities", 0, int(geocodigo))
+
+    def _first(self, table: str, column: int, value: Union[int, str]):
+        rows = self.tables[table].find(column, value)
+        return rows[0] if rows else None
+
+    def _load(self) -> TerritorialIndex:
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = TerritorialIndex.from_rows(**self.tables)
+        return self._index
+
+
+def _format(columns: str) -> str:
+    return "<" + "".join(FORMATS[kind] for kind in columns)
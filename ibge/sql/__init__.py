@@ -0,0 +1,305 @@
+import os
+import threading
+import weakref
+from numbers import Integral, Real
+from typing import TYPE_CHECKING, Dict, Optional
+
+from ibge.sql import tracing
+from ibge.sql.queries import STATEMENTS
+
+if TYPE_CHECKING:
+    import duckdb
+
+
+IBGE_DB = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "ibge.duckdb"
+)
+
+# One row per city with every ancestor's id, name and position in its own
+# table (`*_order`, used to keep the original table order in results).
+# Mesoregions have no id of their own, so they're keyed by their full IBGE
+# code: state geocode followed by the two-digit mesoregion code.
+TERRITORY_QUERY = """
+SELECT
+    cities.id AS city_id,
+    cities.name AS city_name,
+    CAST(cities.rowid AS INTEGER) AS city_order,
+    microregions.id AS microregion_id,
+    microregions.name AS microregion_name,
+    microregions.geographic_id AS microregion_geographic_id,
+    CAST(microregions.rowid AS INTEGER) AS microregion_order,
+    CAST(
+        CASE
+            WHEN mesoregions.geographic_id < 100
+            THEN mesoregions.state * 100 + mesoregions.geographic_id
+            ELSE mesoregions.geographic_id
+        END AS INTEGER
+    ) AS mesoregion_id,
+    mesoregions.name AS mesoregion_name,
+    mesoregions.geographic_id AS mesoregion_geographic_id,
+    CAST(mesoregions.rowid AS INTEGER) AS mesoregion_order,
+    states.id AS state_id,
+    states.name AS state_name,
+    states.uf AS uf,
+    CAST(states.rowid AS INTEGER) AS state_order,
+    macroregions.id AS macroregion_id,
+    macroregions.name AS macroregion_name
+FROM cities
+JOIN microregions ON cities.microregion = microregions.id
+JOIN mesoregions ON microregions.mesoregion = mesoregions.name
+JOIN states ON mesoregions.state = states.id
+JOIN macroregions ON states.macroregion = macroregions.id
+ORDER BY cities.rowid
+"""
+
+TERRITORY_INDEXES = {
+    "territory_city": "city_id",
+    "territory_microregion": "microregion_id",
+    "territory_mesoregion": "mesoregion_id",
+    "territory_state": "state_id",
+    "territory_macroregion": "macroregion_id",
+}
+
+
+class ThreadCursor:
+    """
+    A thread's cursor and the statements prepared on it. Kept only by the
+    thread, so the cursor is closed when it exits.
+    """
+
+    __slots__ = ("cursor", "prepared", "generation", "__weakref__")
+
+    def __init__(self, cursor: "duckdb.DuckDBPyConnection", generation: int):
+        self.cursor = cursor
+        self.prepared = set()
+        self.generation = generation
+        release = weakref.finalize(self, _release, cursor, os.getpid())
+        release.atexit = False
+
+
+def _release(cursor: "duckdb.DuckDBPyConnection", pid: int) -> None:
+    if pid != os.getpid():
+        return  # inherited through fork()
+    import duckdb
+
+    try:
+        cursor.close()
+    except duckdb.Error:
+        pass  # already closed with the pool
+
+
+class ConnectionPool:
+    """
+    Single connection to `database`, attached read-only, opened on first use
+    and shared by the whole process. Each thread queries through its own
+    cursor, and a forked process reopens the connection instead of reusing
+    the parent's.
+    """
+
+    database: str
+    statements: Dict[str, str]
+
+    def __init__(
+        self, database: str = IBGE_DB, statements: Dict[str, str] = STATEMENTS
+    ):
+        self.database = database
+        self.statements = statements
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connection: Optional["duckdb.DuckDBPyConnection"] = None
+        # Weak, so a cursor (and its temporary tables) goes with its thread
+        self._cursors: "weakref.WeakSet[duckdb.DuckDBPyConnection]" = weakref.WeakSet()
+        self._search_path = ""
+        self._generation = 0
+        self._pid = os.getpid()
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def is_open(self) -> bool:
+        return self._connection is not None and self._pid == os.getpid()
+
+    def connection(self) -> "duckdb.DuckDBPyConnection":
+        with self._lock:
+            return self._open()
+
+    def cursor(self) -> "duckdb.DuckDBPyConnection":
+        return self._thread_state().cursor
+
+    def execute(self, name: str, *params) -> "duckdb.DuckDBPyConnection":
+        """
+        Runs the named statement with `params` on the thread's cursor,
+        preparing it on first use
+        """
+        state = self._thread_state()
+        db, prepared = state.cursor, state.prepared
+
+        if name not in prepared:
+            db.execute(f"PREPARE {name} AS {self.statements[name]}")
+            prepared.add(name)
+            tracing.count("prepared")
+
+        query = f"EXECUTE {name}"
+        if params:
+            query += f"({', '.join(map(literal, params))})"
+        if tracing.enabled():
+            return tracing.TracedResult(
+                name, self.statements[name], params, lambda: db.execute(query)
+            )
+        return db.execute(query)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+                self._pid = os.getpid()
+                return
+
+            for cursor in list(self._cursors):
+                cursor.close()
+
+            if self._connection is not None:
+                self._connection.close()
+
+            self._reset()
+
+    def _thread_state(self) -> ThreadCursor:
+        """
+        The calling thread's cursor and prepared statements, opened anew
+        after a close or fork. Returned as a whole so a concurrent close
+        can't pair one generation's cursor with another's statements.
+        """
+        state = getattr(self._local, "state", None)
+        if (
+            state is None
+            or state.generation != self._generation
+            or self._pid != os.getpid()
+        ):
+            with self._lock:
+                cursor = self._open().cursor()
+                tracing.count("cursors")
+                self._cursors.add(cursor)
+                local = self._local
+                generation = self._generation
+            _use_database(cursor, self._search_path)
+            state = ThreadCursor(cursor, generation)
+            local.state = state
+        return state
+
+    def _open(self) -> "duckdb.DuckDBPyConnection":
+        if self._pid != os.getpid():
+            # Handles inherited through fork() belong to the parent process
+            self._reset()
+            self._pid = os.getpid()
+
+        if self._connection is None:
+            # Imported on first query: duckdb dominates the package's import time
+            import duckdb
+
+            # The file is attached read-only to an in-memory database, where
+            # the `territory` fallback is built once for every cursor
+            self._connection = duckdb.connect(":memory:")
+            self._connection.execute(
+                f"ATTACH {literal(self.database)} AS ibge (READ_ONLY)"
+            )
+            self._connection.execute("USE ibge")
+            tracing.count("connections")
+            self._search_path = ensure_territory(self._connection)
+            _use_database(self._connection, self._search_path)
+            self._generation += 1
+
+        return self._connection
+
+    def _reset(self) -> None:
+        self._connection = None
+        self._cursors = weakref.WeakSet()
+        self._local = threading.local()
+        self._generation += 1
+
+
+pool = ConnectionPool()
+
+
+def cursor() -> "duckdb.DuckDBPyConnection":
+    return pool.cursor()
+
+
+def close() -> None:
+    pool.close()
+
+
+def execute(name: str, *params) -> "duckdb.DuckDBPyConnection":
+    return pool.execute(name, *params)
+
+
+def literal(value) -> str:
+    """
+    SQL literal for a statement parameter. DuckDB's EXECUTE only accepts
+    constants, so values are rendered here rather than bound.
+    """
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, Integral):
+        return str(int(value))
+    if isinstance(value, Real):
+        return repr(float(value))
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return "[" + ", ".join(map(literal, value)) + "]"
+    raise TypeError(f"Unsupported SQL parameter: {value!r}")
+
+
+def ensure_territory(db: "duckdb.DuckDBPyConnection") -> str:
+    """
+    Makes the `territory` table available to `db`'s cursors: the one stored
+    in the database by `build_territory()` or, when missing or built by an
+    older version (without all columns), an indexed copy in the pool's
+    in-memory database. Returns the search path that resolves to it.
+    """
+    stored = {
+        column
+        for (column,) in db.execute(
+            "SELECT column_name FROM duckdb_columns() "
+            "WHERE database_name = 'ibge' AND table_name = 'territory'"
+        ).fetchall()
+    }
+    if stored and set(db.sql(TERRITORY_QUERY).columns) <= stored:
+        return "ibge.main,memory.main"
+
+    db.execute(f"CREATE TABLE memory.main.territory AS {TERRITORY_QUERY}")
+    for name, column in TERRITORY_INDEXES.items():
+        db.execute(f"CREATE INDEX {name} ON memory.main.territory ({column})")
+    # An outdated stored table must not shadow the copy
+    return "memory.main,ibge.main" if stored else "ibge.main,memory.main"
+
+
+def _use_database(db: "duckdb.DuckDBPyConnection", search_path: str) -> None:
+    """Resolves names in the attached file and the in-memory copy"""
+    db.execute("USE ibge")
+    db.execute(f"SET search_path = {literal(search_path)}")
+
+
+def build_territory(database: str = IBGE_DB) -> None:
+    """
+    Materializes the flattened `territory` table, with its indexes, in
+    `database`. Closes the shared connection first if it points to it.
+    """
+    import duckdb
+
+    if pool.database == database:
+        pool.close()
+
+    db = duckdb.connect(database)
+    try:
+        db.execute(f"CREATE OR REPLACE TABLE territory AS {TERRITORY_QUERY}")
+        for name, column in TERRITORY_INDEXES.items():
+            db.execute(f"CREATE INDEX {name} ON territory ({column})")
+    finally:
+        db.close()
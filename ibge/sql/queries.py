@@ -0,0 +1,122 @@
+from typing import Dict
+
+
+STATE_COLUMNS = "states.id, states.name, states.uf, states.macroregion"
+MESOREGION_COLUMNS = "mesoregions.name, mesoregions.state, mesoregions.geographic_id"
+MICROREGION_COLUMNS = (
+    "microregions.id, microregions.name, microregions.mesoregion, "
+    "microregions.geographic_id"
+)
+# FLOAT coordinates are read back through their shortest decimal representation
+CITY_COLUMNS = (
+    "cities.id, cities.name, cities.microregion, "
+    "CAST(CAST(cities.latitude AS VARCHAR) AS DOUBLE) AS latitude, "
+    "CAST(CAST(cities.longitude AS VARCHAR) AS DOUBLE) AS longitude, "
+    "cities.timezone"
+)
+
+# The same columns, from the flattened `territory` table
+TERRITORY_STATE_COLUMNS = "state_id, state_name, uf, macroregion_id"
+TERRITORY_MESOREGION_COLUMNS = "mesoregion_name, state_id, mesoregion_geographic_id"
+TERRITORY_MICROREGION_COLUMNS = (
+    "microregion_id, microregion_name, mesoregion_name, microregion_geographic_id"
+)
+
+# Named statements run through `ibge.sql.execute(name, *params)`, prepared
+# once per connection. Parameters are positional: $1, $2, ...
+STATEMENTS: Dict[str, str] = {
+    "state_by_id": f"SELECT {STATE_COLUMNS} FROM states WHERE states.id = $1",
+    "state_by_uf": f"SELECT {STATE_COLUMNS} FROM states WHERE states.uf = UPPER($1)",
+    "mesoregion_by_name": (
+        f"SELECT {MESOREGION_COLUMNS} FROM mesoregions "
+        "WHERE LOWER(mesoregions.name) = LOWER($1)"
+    ),
+    "microregion_by_id": (
+        f"SELECT {MICROREGION_COLUMNS} FROM microregions WHERE microregions.id = $1"
+    ),
+    "microregions_by_name": (
+        f"SELECT {MICROREGION_COLUMNS} FROM microregions "
+        "WHERE LOWER(microregions.name) = LOWER($1)"
+    ),
+    "microregions_by_name_and_mesoregion": (
+        f"SELECT {MICROREGION_COLUMNS} FROM microregions "
+        "WHERE LOWER(microregions.name) = LOWER($1) "
+        "AND LOWER(microregions.mesoregion) = LOWER($2)"
+    ),
+    "city_by_id": f"SELECT {CITY_COLUMNS} FROM cities WHERE cities.id = $1",
+    "states_by_macroregion": (
+        "SELECT states.id FROM states WHERE states.macroregion = $1"
+    ),
+    "mesoregions_by_macroregion": (
+        "SELECT DISTINCT mesoregion_name AS name, mesoregion_order "
+        "FROM territory WHERE macroregion_id = $1 "
+        "ORDER BY mesoregion_order"
+    ),
+    "microregions_by_macroregion": (
+        "SELECT DISTINCT microregion_id AS id, microregion_order "
+        "FROM territory WHERE macroregion_id = $1 "
+        "ORDER BY microregion_order"
+    ),
+    "cities_by_macroregion": (
+        "SELECT city_id AS geocodigo FROM territory WHERE macroregion_id = $1 "
+        "ORDER BY city_order"
+    ),
+    "mesoregions_by_state": (
+        "SELECT mesoregions.name FROM mesoregions WHERE mesoregions.state = $1"
+    ),
+    "microregions_by_mesoregion": (
+        "SELECT microregions.id FROM microregions WHERE microregions.mesoregion = $1"
+    ),
+    "cities_by_microregion": (
+        "SELECT cities.id FROM cities WHERE cities.microregion = $1"
+    ),
+    "microregions_by_state": (
+        "SELECT DISTINCT microregion_id AS id, mesoregion_order, microregion_order "
+        "FROM territory WHERE state_id = $1 "
+        "ORDER BY mesoregion_order, microregion_order"
+    ),
+    "cities_by_state": (
+        "SELECT city_id AS geocodigo FROM territory WHERE state_id = $1 "
+        "ORDER BY mesoregion_order, microregion_order, city_order"
+    ),
+    "cities_by_mesoregion": (
+        "SELECT city_id AS geocodigo FROM territory WHERE mesoregion_name = $1 "
+        "ORDER BY microregion_order, city_order"
+    ),
+    "states_by_ids": (
+        f"SELECT {STATE_COLUMNS} FROM states WHERE states.id IN (SELECT UNNEST($1))"
+    ),
+    "mesoregions_by_names": (
+        f"SELECT DISTINCT {TERRITORY_MESOREGION_COLUMNS}, {TERRITORY_STATE_COLUMNS} "
+        "FROM territory WHERE LOWER(mesoregion_name) IN (SELECT UNNEST($1))"
+    ),
+    "microregions_by_ids": (
+        f"SELECT DISTINCT {TERRITORY_MICROREGION_COLUMNS}, "
+        f"{TERRITORY_MESOREGION_COLUMNS}, {TERRITORY_STATE_COLUMNS} "
+        "FROM territory WHERE microregion_id IN (SELECT UNNEST($1))"
+    ),
+    "cities_by_ids": (
+        f"SELECT {CITY_COLUMNS}, {TERRITORY_MICROREGION_COLUMNS}, "
+        f"{TERRITORY_MESOREGION_COLUMNS}, {TERRITORY_STATE_COLUMNS} "
+        "FROM territory JOIN cities ON territory.city_id = cities.id "
+        "WHERE territory.city_id IN (SELECT UNNEST($1))"
+    ),
+    "search_names": (
+        "SELECT 'macrorregiao', id, name, NULL FROM macroregions "
+        "UNION ALL SELECT DISTINCT 'estado', state_id, state_name, uf "
+        "FROM territory "
+        "UNION ALL SELECT DISTINCT 'mesorregiao', mesoregion_id, mesoregion_name, uf "
+        "FROM territory "
+        "UNION ALL SELECT DISTINCT 'microrregiao', microregion_id, microregion_name, uf "
+        "FROM territory "
+        "UNION ALL SELECT 'municipio', city_id, city_name, uf FROM territory"
+    ),
+    "city_geocodes": "SELECT cities.id FROM cities",
+    "state_ufs": "SELECT states.id, states.uf FROM states",
+    "city_coordinates": (
+        "SELECT cities.id, "
+        "CAST(CAST(cities.latitude AS VARCHAR) AS DOUBLE) AS latitude, "
+        "CAST(CAST(cities.longitude AS VARCHAR) AS DOUBLE) AS longitude "
+        "FROM cities ORDER BY cities.rowid"
+    ),
+}
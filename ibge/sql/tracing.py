@@ -0,0 +1,147 @@
+import logging
+import sys
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+
+logger = logging.getLogger("ibge.sql")
+
+_active: ContextVar[Tuple["Trace", ...]] = ContextVar("ibge_traces", default=())
+
+
+class Query(NamedTuple):
+    statement: str
+    sql: str
+    params: tuple
+    seconds: float
+    rows: Optional[int]
+    caller: str
+
+
+class Trace:
+    """
+    Queries and counters recorded while the trace is active in the current
+    thread or task. `callback`, when given, is called with every `Query`.
+    """
+
+    queries: List[Query]
+    counters: Counter
+
+    def __init__(self, callback: Optional[Callable[[Query], None]] = None):
+        self.queries = []
+        self.counters = Counter()
+        self.callback = callback
+        self._tokens = []
+
+    def __enter__(self) -> "Trace":
+        self._tokens.append(_active.set(_active.get() + (self,)))
+        return self
+
+    def __exit__(self, *exc) -> None:
+        _active.reset(self._tokens.pop())
+
+    def __len__(self) -> int:
+        return len(self.queries)
+
+    def __repr__(self) -> str:
+        return (
+            f"<Trace {len(self.queries)} queries, {self.seconds * 1000:.1f} ms, "
+            f"{dict(self.counters)}>"
+        )
+
+    @property
+    def seconds(self) -> float:
+        return sum(query.seconds for query in self.queries)
+
+
+def trace(callback: Optional[Callable[[Query], None]] = None) -> Trace:
+    """
+    Records every query issued by ibge inside the `with` block, e.g.
+
+        with trace() as t:
+            Estado(uf="RJ").municipios
+        t.queries, t.counters
+    """
+    return Trace(callback)
+
+
+def enabled() -> bool:
+    return bool(_active.get()) or logger.isEnabledFor(logging.DEBUG)
+
+
+def count(name: str, amount: int = 1) -> None:
+    for active in _active.get():
+        active.counters[name] += amount
+
+
+def record(query: Query) -> None:
+    for active in _active.get():
+        active.queries.append(query)
+        active.counters["queries"] += 1
+        if active.callback is not None:
+            active.callback(query)
+
+    logger.debug(
+        "%s %s %.3f ms, %s rows, from %s",
+        query.statement,
+        query.params,
+        query.seconds * 1000,
+        query.rows,
+        query.caller,
+    )
+
+
+def caller() -> str:
+    """The closest public ibge function or method up the stack"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        name = frame.f_code.co_name
+        if (
+            module.startswith("ibge.")
+            and not module.startswith("ibge.sql")
+            and module != "ibge.brasil.cache"
+            and (not name.startswith("_") or name.endswith("__"))
+        ):
+            return getattr(frame.f_code, "co_qualname", name)
+        frame = frame.f_back
+    return "?"
+
+
+class TracedResult:
+    """
+    Result of a traced statement: the query is recorded once its rows are
+    fetched, timing execution and fetch together
+    """
+
+    def __init__(self, statement: str, sql: str, params: tuple, run: Callable):
+        self.statement = statement
+        self.sql = sql
+        self.params = params
+        self.caller = caller()
+        self.recorded = False
+        self.start = time.perf_counter()
+        self.result = run()
+
+    def fetchone(self) -> Optional[tuple]:
+        row = self.result.fetchone()
+        self._record(0 if row is None else 1)
+        return row
+
+    def fetchall(self) -> List[tuple]:
+        rows = self.result.fetchall()
+        self._record(len(rows))
+        return rows
+
+    def __getattr__(self, name: str):
+        self._record(None)
+        return getattr(self.result, name)
+
+    def _record(self, rows: Optional[int]) -> None:
+        if self.recorded:
+            return
+        self.recorded = True
+        seconds = time.perf_counter() - self.start
+        record(Query(self.statement, self.sql, self.params, seconds, rows, self.caller))
@@ -1,13 +1,18 @@
+import gc
+import shutil
+import tempfile
+import threading
 import unittest
 from pathlib import Path
 
 import duckdb
 from ibge.brasil import IBGE_DB
+from ibge.sql import ConnectionPool, build_territory, literal
 
 
 class TestIBGEDB(unittest.TestCase):
     def setUp(self):
-        self.db = duckdb.connect(IBGE_DB)
+        self.db = duckdb.connect(IBGE_DB, read_only=True)
 
     def tearDown(self):
         self.db.close()
@@ -114,3 +119,181 @@ class TestIBGEDB(unittest.TestCase):
         cities_count = self.db.sql("SELECT COUNT(*) FROM cities").fetchone()
         expected_count = 5570
         self.assertEqual(cities_count[0], expected_count)
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = ConnectionPool(IBGE_DB)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_lazy_connection(self):
+        self.assertFalse(self.pool.is_open)
+        self.pool.cursor()
+        self.assertTrue(self.pool.is_open)
+
+    def test_cursor_per_thread(self):
+        main_cursor = self.pool.cursor()
+        self.assertIs(self.pool.cursor(), main_cursor)
+
+        results = []
+
+        def query():
+            cursor = self.pool.cursor()
+            count = cursor.sql("SELECT COUNT(*) FROM states").fetchone()[0]
+            results.append((cursor is main_cursor, count))
+
+        thread = threading.Thread(target=query)
+        thread.start()
+        thread.join()
+
+        self.assertEqual(results, [(False, 27)])
+
+    def test_short_lived_threads_release_their_cursors(self):
+        def query():
+            self.pool.execute("state_by_id", 33).fetchall()
+
+        for _ in range(50):
+            thread = threading.Thread(target=query)
+            thread.start()
+            thread.join()
+        gc.collect()
+
+        self.assertLessEqual(len(self.pool._cursors), 1)
+        self.assertEqual(self.pool.execute("state_by_id", 33).fetchone()[0], 33)
+
+    def test_read_only(self):
+        with self.assertRaises(duckdb.Error):
+            self.pool.cursor().execute("CREATE TABLE foo (id INTEGER)")
+
+    def test_close_and_reopen(self):
+        with self.pool as pool:
+            first = pool.cursor()
+        self.assertFalse(self.pool.is_open)
+
+        second = self.pool.cursor()
+        self.assertIsNot(first, second)
+        self.assertEqual(second.sql("SELECT COUNT(*) FROM states").fetchone()[0], 27)
+
+
+class TestTerritory(unittest.TestCase):
+    def test_territory_fallback(self):
+        with ConnectionPool(IBGE_DB) as pool:
+            db = pool.cursor()
+            count = db.sql("SELECT COUNT(*) FROM territory").fetchone()
+            self.assertEqual(count[0], 5570)
+
+            row = db.sql(
+                "SELECT microregion_name, mesoregion_name, uf, macroregion_name "
+                "FROM territory WHERE city_id = 3304557"
+            ).fetchone()
+            self.assertEqual(
+                row,
+                (
+                    "Rio de Janeiro",
+                    "Metropolitana do Rio de Janeiro",
+                    "RJ",
+                    "Sudeste",
+                ),
+            )
+
+    def test_territory_fallback_is_shared_by_threads(self):
+        with ConnectionPool(IBGE_DB) as pool:
+            tables = []
+
+            def query():
+                tables.extend(
+                    pool.cursor()
+                    .sql(
+                        "SELECT database_name, temporary FROM duckdb_tables() "
+                        "WHERE table_name = 'territory'"
+                    )
+                    .fetchall()
+                )
+
+            threads = [threading.Thread(target=query) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(tables, [("memory", False)] * 4)
+            indexes = pool.cursor().sql(
+                "SELECT COUNT(*) FROM duckdb_indexes() WHERE table_name = 'territory'"
+            )
+            self.assertEqual(indexes.fetchone()[0], 5)
+
+    def test_outdated_stored_territory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            database = str(Path(tmp) / "ibge.duckdb")
+            shutil.copy(IBGE_DB, database)
+            db = duckdb.connect(database)
+            db.execute("CREATE TABLE territory AS SELECT id AS city_id FROM cities")
+            db.close()
+
+            with ConnectionPool(database) as pool:
+                row = pool.execute("cities_by_ids", [3304557]).fetchone()
+                self.assertEqual(row[0], 3304557)
+                self.assertEqual(row[-3:], ("Rio de Janeiro", "RJ", 4))
+
+    def test_build_territory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            database = str(Path(tmp) / "ibge.duckdb")
+            shutil.copy(IBGE_DB, database)
+            build_territory(database)
+
+            with ConnectionPool(database) as pool:
+                temporary = (
+                    pool.cursor()
+                    .sql(
+                        "SELECT temporary FROM duckdb_tables() "
+                        "WHERE table_name = 'territory'"
+                    )
+                    .fetchone()
+                )
+                self.assertEqual(temporary, (False,))
+
+                indexes = (
+                    pool.cursor()
+                    .sql(
+                        "SELECT COUNT(*) FROM duckdb_indexes() "
+                        "WHERE table_name = 'territory'"
+                    )
+                    .fetchone()
+                )
+                self.assertEqual(indexes[0], 5)
+
+
+class TestStatements(unittest.TestCase):
+    def setUp(self):
+        self.pool = ConnectionPool(IBGE_DB)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_literal(self):
+        self.assertEqual(literal(33), "33")
+        self.assertEqual(literal("Olho d'Água"), "'Olho d''Água'")
+        self.assertEqual(literal([1, "a"]), "[1, 'a']")
+        self.assertEqual(literal(None), "NULL")
+        with self.assertRaises(TypeError):
+            literal(object())
+
+    def test_execute(self):
+        state = self.pool.execute("state_by_uf", "rj").fetchone()
+        self.assertEqual(state, (33, "Rio de Janeiro", "RJ", 4))
+
+        city = self.pool.execute("city_by_id", 3304557).fetchone()
+        self.assertEqual(city[1], "Rio de Janeiro")
+        self.assertEqual(city[3:], (-22.9129, -43.2003, "America/Sao_Paulo"))
+
+    def test_prepared_once_per_cursor(self):
+        self.pool.execute("state_by_id", 33)
+        self.pool.execute("state_by_id", 35)
+        self.assertEqual(self.pool._thread_state().prepared, {"state_by_id"})
+
+    def test_quoted_parameters(self):
+        self.assertIsNone(
+            self.pool.execute("mesoregion_by_name", "Sertão d'Oeste").fetchone()
+        )
@@ -0,0 +1,190 @@
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover
+    pa = None
+
+from ibge.brasil import enrich, resolve, rollup, search, trace
+
+
+class TestEnrich(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame(
+            {"geocodigo": [3304557, 1234567, 3304557], "valor": [1, 2, 3]}
+        )
+
+    def test_default_fields(self):
+        df = enrich(self.df)
+        self.assertEqual(
+            list(df.columns),
+            [
+                "geocodigo",
+                "valor",
+                "uf",
+                "estado",
+                "mesorregiao",
+                "microrregiao",
+                "macrorregiao",
+                "latitude",
+                "longitude",
+                "fuso_horario",
+            ],
+        )
+        self.assertEqual(
+            df.iloc[0][["uf", "estado", "mesorregiao", "macrorregiao"]].to_list(),
+            ["RJ", "Rio de Janeiro", "Metropolitana do Rio de Janeiro", "Sudeste"],
+        )
+        self.assertEqual(df["latitude"][0], -22.9129)
+        self.assertEqual(df["fuso_horario"][2], "America/Sao_Paulo")
+        self.assertTrue(df.iloc[1][["uf", "latitude"]].isna().all())
+        self.assertEqual(df["valor"].to_list(), [1, 2, 3])
+
+    def test_fields_and_column(self):
+        df = self.df.rename(columns={"geocodigo": "cod"}).astype({"cod": str})
+        df = enrich(df, column="cod", fields=["municipio", "id_estado"])
+        self.assertEqual(list(df.columns), ["cod", "valor", "municipio", "id_estado"])
+        self.assertEqual(df["municipio"][2], "Rio de Janeiro")
+        self.assertEqual(df["id_estado"].to_list(), [33, pd.NA, 33])
+
+    def test_unknown_field(self):
+        with self.assertRaises(ValueError):
+            enrich(self.df, fields=["populacao"])
+
+    def test_traced(self):
+        with trace() as t:
+            enrich(self.df, fields=["uf"])
+        self.assertEqual([query.statement for query in t.queries], ["enrich"])
+        self.assertEqual(t.queries[0].caller, "enrich")
+
+
+class TestResolve(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame(
+            {
+                "cidade": ["Niterói", "NITEROY", "rio de janeiro", "xyzzy", None],
+                "estado": ["rj", "Rio de Janeiro", "", "RJ", "RJ"],
+            }
+        )
+
+    def test_resolve(self):
+        df = resolve(self.df, "cidade", uf="estado")
+        self.assertEqual(
+            df["geocodigo"].to_list(), [3303203, 3303203, 3304557, pd.NA, pd.NA]
+        )
+        self.assertEqual(
+            df["qualidade"].to_list(),
+            ["exato", "aproximado", "exato", "nao_encontrado", "nao_encontrado"],
+        )
+        self.assertEqual(df["pontuacao"][0], 1.0)
+        self.assertTrue(0.35 <= df["pontuacao"][1] < 1)
+        self.assertEqual(list(df.columns[:2]), ["cidade", "estado"])
+
+    def test_uf_restricts_matches(self):
+        df = pd.DataFrame({"cidade": ["Niterói", "Niterói"], "uf": ["SP", "RJ"]})
+        df = resolve(df, "cidade", uf="uf", output="cod")
+        self.assertEqual(df["cod"].to_list(), [pd.NA, 3303203])
+
+    def test_homonyms_are_ambiguous_without_uf(self):
+        index = search.load()
+        homonym = ("municipio", 3599999, "Niterói", "SP")
+        with mock.patch.object(
+            search, "load", return_value=search.SearchIndex([*index.entries, homonym])
+        ):
+            df = pd.DataFrame({"cidade": ["Niterói"] * 2, "uf": ["", "SP"]})
+            df = resolve(df, "cidade", uf="uf")
+        self.assertEqual(df["geocodigo"].to_list(), [pd.NA, 3599999])
+        self.assertEqual(df["qualidade"].to_list(), ["ambiguo", "exato"])
+
+    @unittest.skipIf(pa is None, "pyarrow não instalado")
+    def test_minimo_and_arrow(self):
+        table = resolve(pa.Table.from_pandas(self.df), "cidade", minimo=0.99)
+        self.assertEqual(
+            table.column("qualidade").to_pylist()[:2], ["exato", "nao_encontrado"]
+        )
+
+
+class TestRollup(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame(
+            {
+                "geocodigo": [3304557, 3303203, 5300108, 1234567],
+                "populacao": [6.0, 0.5, 3.0, 9.0],
+                "casos": [10, 2, 5, 7],
+                "nome": ["a", "b", "c", "d"],
+            }
+        )
+
+    def test_default_levels(self):
+        df = rollup(self.df)
+        self.assertEqual(
+            list(df.columns), ["nivel", "id", "nome", "uf", "populacao", "casos"]
+        )
+        self.assertEqual(
+            df["nivel"].to_list(),
+            ["microrregiao"] * 2
+            + ["mesorregiao"] * 2
+            + ["estado"] * 2
+            + ["macrorregiao"] * 2,
+        )
+        states = df[df["nivel"] == "estado"]
+        self.assertEqual(states["id"].to_list(), [33, 53])
+        self.assertEqual(
+            states["nome"].to_list(), ["Rio de Janeiro", "Distrito Federal"]
+        )
+        self.assertEqual(states["uf"].to_list(), ["RJ", "DF"])
+        self.assertEqual(states["populacao"].to_list(), [6.5, 3.0])
+        self.assertEqual(states["casos"].to_list(), [12, 5])
+        self.assertEqual(df["casos"].dtype, "int64")
+
+        macroregions = df[df["nivel"] == "macrorregiao"]
+        self.assertEqual(macroregions["nome"].to_list(), ["Centro-Oeste", "Sudeste"])
+        self.assertTrue(macroregions["uf"].isna().all())
+
+    def test_levels_and_aggs(self):
+        df = rollup(
+            self.df,
+            "geocodigo",
+            ["populacao"],
+            levels=["brasil", "municipio"],
+            aggs={"populacao": ["sum", "max", "count"]},
+        )
+        self.assertEqual(df["nivel"].to_list(), ["municipio"] * 3 + ["brasil"])
+        self.assertEqual(df["id"].to_list(), [3303203, 3304557, 5300108, pd.NA])
+        self.assertEqual(df["nome"].iloc[-1], "Brasil")
+        self.assertEqual(df["populacao_sum"].to_list(), [0.5, 6.0, 3.0, 9.5])
+        self.assertEqual(df["populacao_max"].iloc[-1], 6.0)
+        self.assertEqual(df["populacao_count"].iloc[-1], 3)
+
+    def test_string_geocodes_and_value(self):
+        df = self.df.rename(columns={"geocodigo": "cod"})
+        df = df.assign(cod=["3304557", "3303203", "x", None])
+        df = rollup(df, "cod", "casos", levels=["estado"], aggs={"casos": "mean"})
+        self.assertEqual(list(df.columns), ["nivel", "id", "nome", "uf", "casos"])
+        self.assertEqual(df["id"].to_list(), [33])
+        self.assertEqual(df["casos"].to_list(), [6.0])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            rollup(self.df, levels=["pais"])
+        with self.assertRaises(ValueError):
+            rollup(self.df, aggs={"casos": "avg"})
+        with self.assertRaises(ValueError):
+            rollup(self.df, "geocodigo", ["inexistente"])
+
+    def test_traced(self):
+        with trace() as t:
+            rollup(self.df, levels=["estado", "macrorregiao"])
+        self.assertEqual([query.statement for query in t.queries], ["rollup"])
+        self.assertIn("GROUPING SETS", t.queries[0].sql)
+
+    @unittest.skipIf(pa is None, "pyarrow não instalado")
+    def test_arrow(self):
+        table = rollup(pa.Table.from_pandas(self.df), levels=["estado"])
+        self.assertEqual(
+            table.column("nome").to_pylist(), ["Rio de Janeiro", "Distrito Federal"]
+        )
+        self.assertEqual(table.column("casos").to_pylist(), [12, 5])
@@ -0,0 +1,136 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from ibge.brasil import Municipio, Estado, index, nearest, nearest_city, within
+from ibge.brasil import distance_matrix, haversine, neighbors
+from ibge.brasil import geo
+
+
+class TestNearest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.index = geo.load()
+        rng = np.random.default_rng(0)
+        cls.latitudes = rng.uniform(-35, 7, 5000)
+        cls.longitudes = rng.uniform(-75, -33, 5000)
+
+    def brute_force(self, latitudes, longitudes) -> np.ndarray:
+        return haversine(
+            latitudes[:, None],
+            longitudes[:, None],
+            self.index.latitudes,
+            self.index.longitudes,
+        )
+
+    def test_haversine(self):
+        # Rio de Janeiro to São Paulo
+        distance = haversine(-22.9129, -43.2003, -23.5329, -46.6395)
+        self.assertAlmostEqual(float(distance), 357.5, delta=1)
+
+    def test_single_point(self):
+        geocodes, distances = nearest(-22.9129, -43.2003, k=3)
+        self.assertEqual(geocodes.shape, (3,))
+        self.assertEqual(geocodes[0], 3304557)
+        self.assertEqual(distances[0], 0)
+        self.assertTrue(np.all(np.diff(distances) >= 0))
+        self.assertIs(nearest_city(-22.91, -43.2), Municipio(3304557))
+
+    def test_batch_matches_brute_force(self):
+        expected = np.sort(self.brute_force(self.latitudes, self.longitudes), axis=1)
+        for k in (1, 4):
+            with self.subTest(k=k):
+                geocodes, distances = nearest(self.latitudes, self.longitudes, k=k)
+                self.assertEqual(geocodes.shape, (5000, k))
+                np.testing.assert_allclose(distances, expected[:, :k])
+
+    def test_outside_grid(self):
+        geocodes, distances = nearest([40.0, -60.0], [-100.0, 0.0])
+        expected = self.brute_force(np.array([40.0, -60.0]), np.array([-100.0, 0.0]))
+        np.testing.assert_allclose(distances[:, 0], expected.min(axis=1))
+
+    def test_within(self):
+        geocodes, distances = within(-22.9129, -43.2003, 30)
+        self.assertEqual(geocodes[0], 3304557)
+        self.assertTrue(np.all(distances <= 30))
+
+        # Inside the grid, around it, near a pole and across the antimeridian
+        latitudes = np.concatenate([self.latitudes[:200], [40.0, -60.0, 89.0, 0.0]])
+        longitudes = np.concatenate([self.longitudes[:200], [-100.0, 0.0, 0.0, 180.0]])
+        expected = self.brute_force(latitudes, longitudes)
+        for raio in (100, 3000, 15000):
+            found = within(latitudes, longitudes, raio)
+            for (geocodes, distances), row in zip(found, expected):
+                self.assertEqual(
+                    set(geocodes.tolist()),
+                    set(self.index.geocodes[row <= raio].tolist()),
+                )
+                self.assertTrue(np.all(np.diff(distances) >= 0))
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            nearest(0, 0, k=0)
+        with self.assertRaises(ValueError):
+            nearest([0, 1], [0])
+
+    def test_index_backend(self):
+        index.load()
+        try:
+            rebuilt = geo.SpatialIndex(*geo._coordinates())
+        finally:
+            index.unload()
+        np.testing.assert_array_equal(rebuilt.geocodes, self.index.geocodes)
+        np.testing.assert_array_equal(rebuilt.latitudes, self.index.latitudes)
+
+
+class TestDistanceMatrix(unittest.TestCase):
+    def test_matches_haversine(self):
+        cities = [Municipio(3304557), Municipio(3303203), Municipio(3303401)]
+        origins, destinations, matrix = distance_matrix(
+            cities, [3304557, "3302908"], chunk=2
+        )
+        self.assertEqual(origins.tolist(), [3304557, 3303203, 3303401])
+        self.assertEqual(destinations.tolist(), [3304557, 3302908])
+
+        expected = haversine(
+            [[city.info["latitude"]] for city in cities],
+            [[city.info["longitude"]] for city in cities],
+            [-22.9129, Municipio(3302908).info["latitude"]],
+            [-43.2003, Municipio(3302908).info["longitude"]],
+        )
+        np.testing.assert_allclose(matrix, expected)
+        self.assertEqual(matrix[0, 0], 0)
+
+    def test_units_float32_and_memmap(self):
+        state = Estado(uf="RJ")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "rj.npy")
+            result = distance_matrix(state, dtype="float32", path=path, chunk=10)
+            saved = np.load(path, mmap_mode="r")
+            self.assertEqual(saved.shape, (92, 92))
+            self.assertEqual(saved.dtype, np.float32)
+            np.testing.assert_array_equal(saved, result.distancias)
+            del saved, result
+
+        self.assertEqual(
+            distance_matrix(state).origens.tolist(), list(state.raw.municipios)
+        )
+        np.testing.assert_allclose(
+            distance_matrix(state).distancias,
+            distance_matrix(state).distancias.T,
+        )
+
+    def test_unknown_geocode(self):
+        with self.assertRaises(ValueError):
+            distance_matrix([3304557, 1234567])
+
+    def test_neighbors(self):
+        geocodes, distances = neighbors([3304557, 3303203], k=3)
+        self.assertEqual(geocodes.shape, (2, 3))
+        self.assertNotIn(3304557, geocodes[0])
+        self.assertNotIn(3303203, geocodes[1])
+        expected, _ = nearest(-22.9129, -43.2003, k=4)
+        self.assertEqual(geocodes[0].tolist(), expected[1:].tolist())
+        self.assertTrue(np.all(np.diff(distances, axis=1) >= 0))
@@ -0,0 +1,72 @@
+import unittest
+
+import numpy as np
+
+from ibge.brasil import geocodes
+
+
+class TestGeocodes(unittest.TestCase):
+    def test_check_digits(self):
+        # Rio de Janeiro, São Paulo and Brasília
+        self.assertEqual(
+            geocodes.check_digits([330455, 355030, 530010]).tolist(), [7, 8, 8]
+        )
+
+    def test_valid(self):
+        values = [3304557, "3304557", " 5300108 ", 3304558, 330455, 9904557, -1]
+        self.assertEqual(
+            geocodes.valid(values).tolist(),
+            [True, True, True, False, False, False, False],
+        )
+        self.assertEqual(
+            geocodes.valid(np.array([3304557.0, 3304557.5, np.nan])).tolist(),
+            [True, False, False],
+        )
+        self.assertEqual(
+            geocodes.valid(np.array(["3304557", None, "abc"], dtype=object)).tolist(),
+            [True, False, False],
+        )
+
+    def test_valid_arrow(self):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            self.skipTest("pyarrow não instalado")
+        self.assertEqual(
+            geocodes.valid(pa.array([3304557, None])).tolist(), [True, False]
+        )
+
+    def test_known_cities_are_exceptions_to_the_check_digit(self):
+        table = geocodes.GeocodeTable(np.array([3304550]), {33: "RJ"})
+        codes = np.array([3304550, 3304551, 3304557])
+        self.assertEqual(table.valid(codes).tolist(), [True, False, True])
+
+    def test_expand(self):
+        self.assertEqual(
+            geocodes.expand([330455, "530010", 3304557, 3304558, 999999, 0]).tolist(),
+            [3304557, 5300108, 3304557, 0, 0, 0],
+        )
+
+    def test_truncate(self):
+        self.assertEqual(
+            geocodes.truncate([3304557, 330455, 12, "5300108"]).tolist(),
+            [330455, 330455, 0, 530010],
+        )
+
+    def test_state_and_uf(self):
+        codes = [3304557, 330455, 5300108, 9904557, 33]
+        self.assertEqual(geocodes.state(codes).tolist(), [33, 33, 53, 0, 0])
+        self.assertEqual(geocodes.uf(codes).tolist(), ["RJ", "RJ", "DF", "", ""])
+
+    def test_matches_the_scalar_rules(self):
+        table = geocodes.load()
+        rng = np.random.default_rng(0)
+        cities = table.cities[table.cities > 0]
+        codes = np.concatenate([rng.integers(100_000, 9_999_999, 5000), cities])
+        expected = [
+            len(str(code)) == 7
+            and table.ufs[code // 100_000] != ""
+            and geocodes.check_digits(code // 10) == code % 10
+            for code in codes.tolist()
+        ]
+        self.assertEqual(geocodes.valid(codes).tolist(), expected)
@@ -1,6 +1,20 @@
+import asyncio
+import copy
+import pickle
+import subprocess
+from array import array
+import sys
+import threading
+import time
 import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest import mock
 
 from ibge.brasil import Macrorregiao, Estado, Mesorregiao, Microrregiao, Municipio
+from ibge.brasil import index, clear_cache, get_cities_from_macroregion, trace
+from ibge.brasil import get_cities_from_microregion
+from ibge.brasil import aio, buscar, search
+from ibge.sql import execute
 
 
 class TestIBGEBrasil(unittest.TestCase):
@@ -183,3 +197,544 @@ class TestIBGEBrasil(unittest.TestCase):
         self.assertEqual(len(rio_de_janeiro_macroregion.microrregioes), 160)
 
         # self.assertEqual(len(rio_de_janeiro_macroregion.municipios), 1668)
+
+
+class TestPlainPythonTypes(unittest.TestCase):
+    def test_import_does_not_load_pandas(self):
+        code = (
+            "import sys, ibge.brasil as b; b.Municipio(3304557).estado.municipios; "
+            "sys.exit('pandas' in sys.modules)"
+        )
+        self.assertEqual(subprocess.run([sys.executable, "-c", code]).returncode, 0)
+
+    def test_attributes_are_builtin_types(self):
+        city = Municipio(3304557)
+        self.assertIs(type(city.microrregiao.id_geografico), int)
+        self.assertIs(type(city.mesorregiao.id_geografico), int)
+        self.assertIs(type(city.estado.geocodigo), int)
+        self.assertIs(type(city.info["latitude"]), float)
+
+        geocodes = get_cities_from_macroregion(Macrorregiao(geocodigo=4), raw=True)
+        self.assertEqual({type(geocode) for geocode in geocodes}, {int})
+
+
+class TestImportTime(unittest.TestCase):
+    # `import ibge.brasil` takes about 45 ms; importing duckdb and
+    # importlib.metadata eagerly made it 130 ms
+    MAX_MILLISECONDS = 100
+
+    def import_time(self) -> float:
+        output = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import ibge.brasil"],
+            capture_output=True,
+            text=True,
+        ).stderr
+        for line in output.splitlines():
+            _, cumulative, module = line.split("|")
+            if module.strip() == "ibge.brasil":
+                return int(cumulative) / 1000
+        self.fail(output)
+
+    def test_import_time(self):
+        best = min(self.import_time() for _ in range(3))
+        self.assertLess(best, self.MAX_MILLISECONDS)
+
+    def test_heavy_dependencies_are_imported_on_first_query(self):
+        code = (
+            "import sys, ibge, ibge.brasil as b; b.Macrorregiao(nome='sul').nome; "
+            "heavy = ['duckdb', 'pandas', 'numpy', 'importlib.metadata']; "
+            "sys.exit(any(module in sys.modules for module in heavy))"
+        )
+        self.assertEqual(subprocess.run([sys.executable, "-c", code]).returncode, 0)
+
+
+class TestIdentityMap(unittest.TestCase):
+    def tearDown(self):
+        clear_cache()
+
+    def test_same_instance_for_every_key(self):
+        self.assertIs(Estado(uf="rj"), Estado(geocodigo=33))
+        self.assertIs(Estado(geocodigo="33"), Estado(uf="RJ"))
+        self.assertIs(Macrorregiao(nome="sudeste"), Macrorregiao(geocodigo=4))
+        self.assertIs(
+            Mesorregiao("metropolitana do rio de janeiro"),
+            Mesorregiao("Metropolitana do Rio de Janeiro"),
+        )
+        self.assertIs(Microrregiao(__id__=33018), Microrregiao(nome="Rio de Janeiro"))
+        self.assertIs(Municipio("3304557"), Municipio(3304557))
+
+    def test_children_share_parents(self):
+        cities = Microrregiao(__id__=33018).municipios
+        self.assertEqual(len({id(city.microrregiao) for city in cities}), 1)
+        self.assertEqual(len({id(city.estado) for city in cities}), 1)
+        self.assertIs(cities[0].estado, Estado(uf="RJ"))
+
+    def test_clear_cache(self):
+        state = Estado(uf="RJ")
+        clear_cache()
+        self.assertIsNot(state, Estado(uf="RJ"))
+        self.assertEqual(state, Estado(uf="RJ"))
+
+    def test_lookups_are_not_repeated(self):
+        Municipio(3304557).estado
+        with mock.patch("ibge.brasil.execute", side_effect=AssertionError):
+            city = Municipio(3304557)
+            self.assertIs(city.estado, Estado(uf="RJ"))
+
+    def test_parents_are_resolved_lazily(self):
+        clear_cache()
+        with mock.patch("ibge.brasil.execute", wraps=execute) as mocked:
+            city = Municipio(3304557)
+            self.assertEqual(mocked.call_count, 1)
+            self.assertEqual(str(city.macrorregiao), "Sudeste")
+        self.assertIs(city.estado, Estado(uf="RJ"))
+
+    def test_instances_have_no_dict(self):
+        city = Municipio(3304557)
+        for unit in (city, city.microrregiao, city.mesorregiao, city.estado):
+            self.assertFalse(hasattr(unit, "__dict__"))
+        self.assertFalse(hasattr(city.macrorregiao, "__dict__"))
+
+
+def _state_of(city: Municipio) -> Estado:
+    return city.estado
+
+
+class TestPickle(unittest.TestCase):
+    def test_round_trip_returns_the_cached_instance(self):
+        city = Municipio(3304557)
+        units = [
+            city,
+            city.microrregiao,
+            city.mesorregiao,
+            city.estado,
+            city.macrorregiao,
+        ]
+        for unit in units:
+            with self.subTest(unit=type(unit).__name__):
+                self.assertIs(pickle.loads(pickle.dumps(unit)), unit)
+                self.assertIs(copy.deepcopy(unit), unit)
+
+    def test_loaded_collections_are_not_pickled(self):
+        macroregion = Macrorregiao(geocodigo=4)
+        empty = len(pickle.dumps(macroregion))
+        macroregion.municipios
+        self.assertEqual(len(pickle.dumps(macroregion)), empty)
+
+    def test_rehydrated_in_another_process(self):
+        city = Municipio(3304557)
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            state = pool.submit(_state_of, city).result()
+        self.assertIs(state, Estado(uf="RJ"))
+
+
+class TestMany(unittest.TestCase):
+    def tearDown(self):
+        clear_cache()
+
+    def test_municipio_many(self):
+        with mock.patch("ibge.brasil.execute", wraps=execute) as mocked:
+            cities = Municipio.many([3304557, "3304557", 3304557])
+        self.assertEqual(mocked.call_count, 1)
+        self.assertEqual(list(map(str, cities)), ["Rio de Janeiro"] * 3)
+        self.assertIs(cities[0], cities[1])
+        self.assertIs(cities[0], Municipio(3304557))
+        self.assertIs(cities[0].estado, Estado(uf="RJ"))
+
+    def test_many_on_missing(self):
+        with self.assertRaises(ValueError):
+            Municipio.many([3304557, 1234567])
+
+        self.assertEqual(
+            Municipio.many([1234567, 3304557, "abc"], on_missing="none"),
+            [None, Municipio(3304557), None],
+        )
+        self.assertEqual(
+            Municipio.many([1234567, 3304557], on_missing="skip"),
+            [Municipio(3304557)],
+        )
+
+        with self.assertRaises(ValueError):
+            Municipio.many([3304557], on_missing="ignore")
+
+    def test_parent_levels_many(self):
+        self.assertEqual(
+            list(map(str, Estado.many([35, 33]))), ["São Paulo", "Rio de Janeiro"]
+        )
+        self.assertEqual(
+            list(map(str, Mesorregiao.many(["baixadas", "Sul Fluminense"]))),
+            ["Baixadas", "Sul Fluminense"],
+        )
+        microregions = Microrregiao.many([33018, 33015])
+        self.assertEqual(list(map(str, microregions)), ["Rio de Janeiro", "Serrana"])
+        self.assertIs(microregions[0].mesorregiao, microregions[1].mesorregiao)
+
+
+class TestPrefetch(unittest.TestCase):
+    def setUp(self):
+        clear_cache()
+
+    def test_collections_cost_constant_queries(self):
+        collections = [
+            lambda: Estado(uf="MG").municipios,
+            lambda: Estado(uf="MG").microrregioes,
+            lambda: Mesorregiao("Baixadas").municipios,
+            lambda: Macrorregiao(geocodigo=4).municipios,
+            lambda: Macrorregiao(geocodigo=4).mesorregioes,
+        ]
+        for collection in collections:
+            clear_cache()
+            with self.subTest(collection=collection), trace() as t:
+                collection()
+            self.assertLessEqual(len(t), 3)
+
+    def test_subtree_collections_are_wired(self):
+        state = Estado(uf="MG")
+        state.municipios
+        with trace() as t:
+            cities = [
+                city for micro in state.microrregioes for city in micro.municipios
+            ]
+        self.assertEqual(
+            [query.statement for query in t.queries], ["microregions_by_state"]
+        )
+        self.assertEqual(cities, state.municipios)
+
+        micro = state.microrregioes[0]
+        self.assertEqual(micro.municipios, get_cities_from_microregion(micro))
+
+
+class TestIter(unittest.TestCase):
+    def setUp(self):
+        clear_cache()
+
+    def test_same_units_as_the_collections(self):
+        units = [
+            (Macrorregiao(geocodigo=4), "estados"),
+            (Macrorregiao(geocodigo=4), "microrregioes"),
+            (Estado(uf="MG"), "mesorregioes"),
+            (Estado(uf="MG"), "municipios"),
+            (Mesorregiao("Baixadas"), "microrregioes"),
+            (Microrregiao(__id__=33018), "municipios"),
+        ]
+        for unit, name in units:
+            with self.subTest(unit=unit, name=name):
+                streamed = list(getattr(unit, f"iter_{name}")(lote=7))
+                self.assertEqual(streamed, getattr(unit, name))
+
+    def test_streams_in_batches(self):
+        state = Estado(uf="MG")
+        with trace() as t:
+            cities = state.iter_municipios(lote=100)
+            self.assertEqual(len(t), 0)
+            first = next(cities)
+            self.assertEqual(len(t), 2)
+            self.assertEqual(len([first, *cities]), 740)
+        self.assertEqual(len(t), 1 + 8)
+        self.assertIsNone(state.__cities__)
+
+        state.municipios
+        with trace() as t:
+            list(state.iter_municipios())
+        self.assertEqual(len(t), 0)
+
+    def test_empty_collections_are_cached(self):
+        microregion = Microrregiao(__id__=33018)
+        with mock.patch(
+            "ibge.brasil.get_cities_from_microregion", return_value=[]
+        ) as mocked:
+            self.assertEqual(microregion.municipios, [])
+            self.assertEqual(microregion.municipios, [])
+            self.assertEqual(list(microregion.iter_municipios()), [])
+        self.assertEqual(mocked.call_count, 1)
+
+
+class TestRaw(unittest.TestCase):
+    def tearDown(self):
+        clear_cache()
+        index.unload()
+
+    def assertRawMatches(self, unit):
+        for name in dir(unit.raw):
+            keys = getattr(unit.raw, name)
+            units = getattr(unit, name)
+            if name == "mesorregioes":
+                self.assertEqual(keys, [mesoregion.nome for mesoregion in units])
+            elif name == "microrregioes":
+                self.assertEqual(keys, array("i", [micro.__id__ for micro in units]))
+            else:
+                self.assertEqual(keys, array("i", [u.geocodigo for u in units]))
+
+    def test_raw_does_not_build_objects(self):
+        clear_cache()
+        geocodes = Macrorregiao(geocodigo=2).raw.municipios
+        self.assertIsInstance(geocodes, array)
+        self.assertEqual(len(geocodes), len(set(geocodes)))
+        self.assertIsNone(Municipio.cached(geocodes[0]))
+        self.assertEqual(len(Estado(uf="RJ").raw.municipios), 92)
+
+    def test_raw_matches_properties(self):
+        for loaded in (False, True):
+            if loaded:
+                index.load()
+            with self.subTest(index=loaded):
+                self.assertRawMatches(Macrorregiao(geocodigo=4))
+                self.assertRawMatches(Estado(uf="RJ"))
+                self.assertRawMatches(Mesorregiao("Sul Fluminense"))
+                self.assertRawMatches(Microrregiao(__id__=33018))
+
+    def test_raw_unknown_collection(self):
+        with self.assertRaises(AttributeError):
+            Municipio(3304557).estado.raw.estados
+
+
+class TestTrace(unittest.TestCase):
+    def setUp(self):
+        clear_cache()
+
+    def test_records_queries(self):
+        with trace() as t:
+            Estado(uf="RJ")
+            Microrregiao(__id__=33018).municipios
+
+        statements = [query.statement for query in t.queries]
+        self.assertEqual(
+            statements,
+            [
+                "state_by_uf",
+                "microregion_by_id",
+                "cities_by_microregion",
+                "cities_by_ids",
+            ],
+        )
+        first = t.queries[0]
+        self.assertEqual((first.params, first.rows), (("RJ",), 1))
+        self.assertEqual(first.caller, "Estado.__init__")
+        self.assertEqual(t.queries[2].caller, "get_cities_from_microregion")
+        self.assertEqual(t.queries[3].caller, "get_cities_from_microregion")
+        self.assertEqual(t.counters["queries"], len(t))
+        self.assertGreater(t.seconds, 0)
+
+    def test_cache_counters(self):
+        Estado(uf="RJ")
+        with trace() as t:
+            Estado(uf="RJ")
+            Estado(uf="SP")
+        self.assertEqual(t.counters["cache_hits"], 1)
+        self.assertEqual(t.counters["cache_misses"], 1)
+        self.assertEqual(len(t), 1)
+
+    def test_callback_and_nesting(self):
+        seen = []
+        with trace(seen.append) as outer:
+            Estado(uf="RJ")
+            with trace() as inner:
+                Estado(uf="SP")
+        self.assertEqual(len(outer), 2)
+        self.assertEqual(len(inner), 1)
+        self.assertEqual(seen, outer.queries)
+
+    def test_only_current_thread(self):
+        with trace() as t:
+            thread = threading.Thread(target=Estado, kwargs={"uf": "RJ"})
+            thread.start()
+            thread.join()
+        self.assertEqual(len(t), 0)
+
+    def test_logging(self):
+        with self.assertLogs("ibge.sql", "DEBUG") as logs:
+            Estado(uf="RJ")
+        self.assertIn("state_by_uf", logs.output[0])
+        self.assertIn("Estado.__init__", logs.output[0])
+
+
+class TestBuscar(unittest.TestCase):
+    def tearDown(self):
+        index.unload()
+        search.reset()
+
+    def test_accent_insensitive_ranking(self):
+        for loaded in (False, True):
+            if loaded:
+                index.load()
+                search.reset()
+            with self.subTest(index=loaded):
+                results = buscar("sao joao de", nivel="municipio", uf="rj")
+                self.assertEqual(results[0].chave, 3303401)
+                self.assertEqual(results[0].nome, "São João de Meriti")
+                self.assertIs(results[0].unidade(), Municipio(3303401))
+
+                exact = buscar("NITERÓI")[0]
+                self.assertEqual((exact.nivel, exact.pontuacao), ("municipio", 1.0))
+                self.assertEqual(buscar("meriti")[0].chave, 3303401)
+                self.assertEqual(buscar("Nitero")[0].nome, "Niterói")
+                self.assertEqual(buscar("niteroy")[0].nome, "Niterói")
+
+    def test_levels_and_limit(self):
+        results = buscar("rio de janeiro", limite=3)
+        self.assertEqual(
+            {result.nivel for result in results},
+            {"estado", "microrregiao", "municipio"},
+        )
+        self.assertEqual(buscar("rio de janeiro", nivel="estado")[0].chave, 33)
+        self.assertEqual(buscar("sudeste")[0].unidade(), Macrorregiao(geocodigo=4))
+        self.assertEqual(buscar("  "), [])
+        with self.assertRaises(ValueError):
+            buscar("rio", nivel="bairro")
+
+    def test_constructors_without_accents(self):
+        self.assertIs(
+            Mesorregiao("triangulo mineiro/alto paranaiba"),
+            Mesorregiao("Triângulo Mineiro/Alto Paranaíba"),
+        )
+        self.assertEqual(Microrregiao("itaguai").__id__, 33017)
+        self.assertEqual(
+            Microrregiao("itaguai", mesorregiao="metropolitana do rio de janeiro"),
+            Microrregiao(__id__=33017),
+        )
+        with self.assertRaises(ValueError):
+            Mesorregiao("mesorregiao inexistente")
+
+
+class TestAio(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        clear_cache()
+
+    async def test_lookups(self):
+        city = await aio.municipio(3304557)
+        self.assertIs(city, Municipio(3304557))
+        self.assertIs(await aio.estado(uf="rj"), city.estado)
+        self.assertIs(await aio.macrorregiao(geocodigo=4), city.macrorregiao)
+        self.assertIs(await aio.mesorregiao("Baixadas"), Mesorregiao("Baixadas"))
+        self.assertEqual((await aio.microrregiao(__id__=33018)).nome, "Rio de Janeiro")
+        self.assertEqual(len(await aio.many(Municipio, [3304557, 3303203])), 2)
+
+        with self.assertRaises(ValueError):
+            await aio.municipio(1234567)
+
+    async def test_concurrent_requests_are_coalesced(self):
+        with mock.patch("ibge.brasil.execute", wraps=execute) as mocked:
+            cities = await asyncio.gather(*(aio.municipio(3304557) for _ in range(50)))
+        self.assertEqual(mocked.call_count, 1)
+        self.assertEqual(len({id(city) for city in cities}), 1)
+
+        with mock.patch("ibge.brasil.execute", side_effect=AssertionError):
+            self.assertIs(await aio.municipio("3304557"), cities[0])
+
+    async def test_collections(self):
+        state = await aio.estado(uf="RJ")
+        cities, raw = await asyncio.gather(
+            aio.collection(state, "municipios"),
+            aio.collection(state, "municipios", raw=True),
+        )
+        self.assertEqual([city.geocodigo for city in cities], list(raw))
+        self.assertIs(cities, state.municipios)
+
+    async def test_configure_does_not_wait_for_running_lookups(self):
+        started, release = threading.Event(), threading.Event()
+
+        def lookup():
+            started.set()
+            release.wait(5)
+            return Municipio(3304557)
+
+        workers = aio.MAX_WORKERS
+        running = asyncio.ensure_future(aio.run(lookup))
+        await asyncio.to_thread(started.wait, 5)
+        try:
+            start = time.perf_counter()
+            aio.configure(max_workers=2)
+            self.assertLess(time.perf_counter() - start, 1)
+            self.assertIs(await aio.municipio(3303203), Municipio(3303203))
+        finally:
+            release.set()
+            aio.configure(max_workers=workers)
+        self.assertIs(await running, Municipio(3304557))
+
+    async def test_trace_follows_the_call(self):
+        with trace() as t:
+            await aio.estado(uf="SP")
+        self.assertEqual([query.statement for query in t.queries], ["state_by_uf"])
+
+
+class TestThreadSafety(unittest.TestCase):
+    def setUp(self):
+        clear_cache()
+
+    def tearDown(self):
+        clear_cache()
+
+    def lookups(self):
+        return [
+            lambda: str(Municipio(3304557).estado),
+            lambda: [city.geocodigo for city in Estado(uf="RJ").municipios],
+            lambda: [city.nome for city in Mesorregiao("Baixadas").municipios],
+            lambda: [str(micro) for micro in Macrorregiao(geocodigo=4).microrregioes],
+            lambda: list(Estado(uf="MG").raw.microrregioes),
+            lambda: [str(city) for city in Municipio.many([3303203, 3303401])],
+            lambda: [result.chave for result in buscar("niteroi", limite=3)],
+            lambda: Microrregiao(__id__=33018).municipios[0].info,
+        ]
+
+    def test_concurrent_lookups(self):
+        lookups = self.lookups()
+        expected = [lookup() for lookup in lookups]
+        clear_cache()
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            futures = [
+                (i % len(lookups), pool.submit(lookups[i % len(lookups)]))
+                for i in range(2000)
+            ]
+            results = [(i, future.result()) for i, future in futures]
+
+        for i, result in results:
+            self.assertEqual(result, expected[i])
+
+    def test_collections_load_once(self):
+        microregion = Microrregiao(__id__=33018)
+        barrier = threading.Barrier(8)
+
+        def load():
+            barrier.wait()
+            return microregion.municipios
+
+        with mock.patch("ibge.brasil.execute", wraps=execute) as mocked:
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                loaded = list(pool.map(lambda _: load(), range(8)))
+
+        statements = [call.args[0] for call in mocked.call_args_list]
+        self.assertEqual(statements.count("cities_by_microregion"), 1)
+        self.assertEqual(len({id(cities) for cities in loaded}), 1)
+
+
+class TestIBGEBrasilIndex(TestIBGEBrasil):
+    @classmethod
+    def setUpClass(cls):
+        index.load()
+
+    @classmethod
+    def tearDownClass(cls):
+        index.unload()
+
+    def test_index_lookups_without_sql(self):
+        with mock.patch("ibge.brasil.execute", side_effect=AssertionError):
+            self.assertEqual(str(Municipio(3304557)), "Rio de Janeiro")
+            self.assertEqual(str(Estado(uf="rj")), "Rio de Janeiro")
+            self.assertEqual(len(Estado(geocodigo=33).municipios), 92)
+            self.assertEqual(len(Macrorregiao(geocodigo=4).microrregioes), 160)
+
+    def test_index_reload(self):
+        reloaded = index.reload()
+        self.assertIs(index.get(), reloaded)
+        self.assertEqual(len(reloaded.cities), 5570)
+        self.assertEqual(reloaded.state(uf="RJ")[0], 33)
+
+    def test_derived_data_is_rebuilt_on_reload(self):
+        builder = mock.Mock(side_effect=lambda: object())
+        derived = index.derived(builder)
+        first = derived.load()
+        self.assertIs(derived.load(), first)
+        index.reload()
+        self.assertIsNot(derived.load(), first)
+        self.assertEqual(builder.call_count, 2)
@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from ibge import sql
+from ibge.brasil import Estado, Mesorregiao, Microrregiao, Municipio
+from ibge.brasil import clear_cache, index, snapshot
+from ibge.tests import test_ibge_brasil
+
+
+def setUpModule():
+    global directory, path
+    directory = tempfile.TemporaryDirectory()
+    path = os.path.join(directory.name, "ibge.snapshot")
+    snapshot.export(path)
+
+
+def tearDownModule():
+    directory.cleanup()
+
+
+class TestSnapshot(unittest.TestCase):
+    def tearDown(self):
+        index.unload()
+        clear_cache()
+
+    def test_same_rows_as_the_index(self):
+        mapped = snapshot.SnapshotIndex(path)
+        territory = index.TerritorialIndex(sql.cursor())
+
+        for geocode in territory.cities:
+            self.assertEqual(mapped.city(geocode), territory.city(geocode))
+        for row in territory.microregions.values():
+            self.assertEqual(mapped.microregion(row[0]), row)
+            self.assertEqual(
+                mapped.microregions_named(row[1].upper(), row[2]),
+                territory.microregions_named(row[1], row[2]),
+            )
+        for name in territory.mesoregions:
+            self.assertEqual(
+                mapped.mesoregion(name.upper()), territory.mesoregion(name)
+            )
+        self.assertEqual(mapped.state(uf="rj"), territory.state(uf="RJ"))
+        self.assertIsNone(mapped.city(1234567))
+        self.assertIsNone(mapped.mesoregion("mesorregiao inexistente"))
+
+        for name in index.TerritorialIndex.__annotations__:
+            self.assertEqual(getattr(mapped, name), getattr(territory, name), name)
+
+    def test_lookups_without_sql(self):
+        index.load(snapshot=path)
+        with mock.patch("ibge.brasil.execute", side_effect=AssertionError):
+            city = Municipio(3304557)
+            self.assertEqual(city.estado, Estado(uf="rj"))
+            self.assertEqual(city.microrregiao, Microrregiao(__id__=33018))
+            self.assertEqual(city.mesorregiao, Mesorregiao(city.mesorregiao.nome))
+            self.assertEqual(len(city.estado.municipios), 92)
+
+    def test_fresh_process_does_not_import_duckdb(self):
+        code = (
+            "import sys; from ibge import sql; from ibge.brasil import index, Municipio; "
+            f"index.load(snapshot={path!r}); "
+            "sys.exit(str(Municipio(3304557).estado) != 'Rio de Janeiro' "
+            "or sql.pool.is_open or 'duckdb' in sys.modules)"
+        )
+        self.assertEqual(subprocess.run([sys.executable, "-c", code]).returncode, 0)
+
+    def test_reload_reopens_the_snapshot(self):
+        index.load(snapshot=path)
+        self.assertIsInstance(index.reload(), snapshot.SnapshotIndex)
+
+    def test_load_switches_to_the_snapshot(self):
+        loaded = index.load()
+        self.assertIs(index.load(), loaded)
+        self.assertIsInstance(index.load(snapshot=path), snapshot.SnapshotIndex)
+        self.assertIs(index.load(snapshot=path), index.get())
+        self.assertIs(index.load(), index.get())
+
+    def test_invalid_file(self):
+        with tempfile.NamedTemporaryFile() as file:
+            file.write(b"not a snapshot")
+            file.flush()
+            with self.assertRaises(ValueError):
+                snapshot.SnapshotIndex(file.name)
+
+
+class TestIBGEBrasilSnapshot(test_ibge_brasil.TestIBGEBrasil):
+    @classmethod
+    def setUpClass(cls):
+        index.load(snapshot=path)
+
+    @classmethod
+    def tearDownClass(cls):
+        index.unload()
+        clear_cache()